@@ -0,0 +1,104 @@
+# backend/admission.py
+import os
+import math
+import asyncio
+from contextlib import contextmanager
+
+from metrics import ADMISSION, ADMISSION_COMMITTED, LLM_INFLIGHT, RECENT_QUEUE_WAIT
+
+# Load levels, from cheapest degradation to outright rejection
+NORMAL, SKIP_POLISH, DEFER_SPEECHES, REJECT = 0, 1, 2, 3
+
+class Overloaded(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("Server is at capacity; retry shortly")
+        self.retry_after = retry_after
+
+class AdmissionController:
+    # Pressure = LLM calls in flight (the larger of the live gauge and calls committed by admitted
+    # requests) and the recent upstream queue wait. Each level has an in-flight and a wait threshold.
+    def __init__(self, soft_inflight: int, defer_inflight: int, hard_inflight: int,
+                 soft_wait: float, defer_wait: float, hard_wait: float, retry_after: int = 5):
+        self.inflight_limits = (soft_inflight, defer_inflight, hard_inflight)
+        self.wait_limits = (soft_wait, defer_wait, hard_wait)
+        self.retry_after = retry_after
+        self.committed = 0
+
+    def inflight(self) -> float:
+        return max(LLM_INFLIGHT.value(), self.committed)
+
+    def level(self) -> int:
+        inflight, wait = self.inflight(), RECENT_QUEUE_WAIT.value()
+        level = NORMAL
+        for lvl, (max_calls, max_wait) in enumerate(zip(self.inflight_limits, self.wait_limits), start=1):
+            if inflight >= max_calls or wait >= max_wait:
+                level = lvl
+        return level
+
+    def check(self) -> int:
+        level = self.level()
+        if level >= REJECT:
+            ADMISSION.inc("reject")
+            raise Overloaded(max(self.retry_after, math.ceil(RECENT_QUEUE_WAIT.value())))
+        return level
+
+    def admit_call(self):
+        # Single-call endpoints (chat, PO): nothing to shed, only the hard limit applies
+        self.check()
+        ADMISSION.inc("admit")
+
+    def plan_generate(self, polish: bool, speeches: bool) -> tuple[bool, bool, list[str]]:
+        # Drop polish first, then full speeches; returns the (polish, speeches) to run and what was shed
+        level = self.check()
+        degraded = []
+        if level >= SKIP_POLISH and polish:
+            polish = False
+            degraded.append("polish")
+        if level >= DEFER_SPEECHES and speeches:
+            speeches = False
+            degraded.append("speeches")
+        ADMISSION.inc("degrade" if degraded else "admit")
+        return polish, speeches, degraded
+
+    async def wait_normal(self, poll: float = 0.5):
+        # Background work (jobs): nothing is shed or rejected; it waits, backing off, until live
+        # traffic is back under the soft limits
+        if self.level() > NORMAL:
+            ADMISSION.inc("defer")
+            delay = poll
+            while self.level() > NORMAL:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.retry_after)
+        ADMISSION.inc("admit")
+
+    @contextmanager
+    def track(self, calls: int):
+        self.committed += calls
+        ADMISSION_COMMITTED.set(value=self.committed)
+        try:
+            yield
+        finally:
+            self.committed -= calls
+            ADMISSION_COMMITTED.set(value=self.committed)
+
+    def stats(self) -> dict:
+        return {
+            "level": self.level(),
+            "inflight_calls": self.inflight(),
+            "committed_calls": self.committed,
+            "recent_queue_wait_s": round(RECENT_QUEUE_WAIT.value(), 3),
+        }
+
+def generate_calls(polish: bool, speeches: bool, variants: int = 1) -> int:
+    # Extra package variants are separate completions even when the provider returns them in one call
+    return (2 if polish else 1) * (2 if speeches else 1) + variants - 1
+
+admission = AdmissionController(
+    soft_inflight=int(os.getenv("ADMIT_SOFT_INFLIGHT", "32")),
+    defer_inflight=int(os.getenv("ADMIT_DEFER_INFLIGHT", "64")),
+    hard_inflight=int(os.getenv("ADMIT_HARD_INFLIGHT", "128")),
+    soft_wait=float(os.getenv("ADMIT_SOFT_WAIT_S", "2")),
+    defer_wait=float(os.getenv("ADMIT_DEFER_WAIT_S", "5")),
+    hard_wait=float(os.getenv("ADMIT_HARD_WAIT_S", "15")),
+    retry_after=int(os.getenv("ADMIT_RETRY_AFTER", "5")),
+)
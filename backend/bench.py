@@ -0,0 +1,209 @@
+# backend/bench.py
+# Offline benchmark / load test for the API orchestration layer.
+#
+#   python bench.py                                  # all scenarios, mock backend, in-process ASGI
+#   python bench.py -s generate_full,chat -c 1,8,32 -n 64 --out bench.json
+#   MOCK_LATENCY=fixed:0.5 MOCK_ERROR_RATE=0.05 python bench.py
+#   python bench.py --url http://127.0.0.1:8000      # drive a running server instead
+#
+# Reports throughput and p50/p95/p99 latency (plus time to first token for streams) as JSON.
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+BILL = (
+    "A BILL to establish a federal high-speed rail corridor grant program.\n"
+    "SECTION 1. The Secretary of Transportation shall award competitive grants to states for corridor construction.\n"
+    "SECTION 2. $4,000,000,000 is appropriated annually for fiscal years 2026 through 2030.\n"
+    "SECTION 3. Grantees shall provide a 20 percent non-federal match."
+)
+
+def _bill(i: int, same: bool) -> str:
+    # Unique bills by default so cache/single-flight do not flatter the numbers
+    return BILL if same else f"{BILL}\n(Docket item #{i})"
+
+SCENARIOS = {
+    "generate": ("/api/generate", lambda i, same: {"bill": _bill(i, same)}),
+    "generate_full": ("/api/generate", lambda i, same: {"bill": _bill(i, same), "return_full_speeches": True}),
+    "generate_stream": ("/api/generate/stream", lambda i, same: {"bill": _bill(i, same), "return_full_speeches": True}),
+    "chat": ("/api/chat", lambda i, same: {"message": f"Give me three QX questions (#{i}).", "bill": _bill(i, same)}),
+    "chat_stream": ("/api/chat/stream", lambda i, same: {"message": f"Rewrite contention one (#{i}).", "bill": _bill(i, same)}),
+    "po": ("/api/po-assist", lambda i, same: {"text": f"Chair recognizes Senator Lee (#{i}) for the first affirmative."}),
+    "batch": ("/api/generate/batch", lambda i, same: {"items": [{"bill": _bill(i * 5 + k, same)} for k in range(5)]}),
+}
+
+# ===== Transports =====
+async def _asgi_call(app, path: str, payload: dict) -> dict:
+    # Minimal in-process ASGI client that timestamps the first body chunk and first token event
+    body = json.dumps(payload).encode()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("bench", 0), "server": ("bench", 80),
+    }
+    finished = asyncio.Event()
+    sent_body = False
+    out = {"status": 0, "first_byte": None, "first_token": None, "error": False}
+    start = time.perf_counter()
+
+    async def receive():
+        nonlocal sent_body
+        if not sent_body:
+            sent_body = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            out["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            _observe(out, message.get("body", b""), start)
+            if not message.get("more_body", False):
+                finished.set()
+
+    await app(scope, receive, send)
+    finished.set()
+    out["latency"] = time.perf_counter() - start
+    return out
+
+# JSONResponse writes compact JSON ("ok":false); SSE/NDJSON lines use json.dumps spacing ("ok": false)
+_NOT_OK_RE = re.compile(rb'"ok":\s*false')
+
+def _observe(out: dict, chunk: bytes, start: float):
+    if not chunk:
+        return
+    now = time.perf_counter() - start
+    if out["first_byte"] is None:
+        out["first_byte"] = now
+    if out["first_token"] is None and (b"event: token" in chunk or b'"index"' in chunk):
+        out["first_token"] = now
+    if b"event: error" in chunk or _NOT_OK_RE.search(chunk):
+        out["error"] = True
+
+async def _http_call(client, path: str, payload: dict) -> dict:
+    out = {"status": 0, "first_byte": None, "first_token": None, "error": False}
+    start = time.perf_counter()
+    async with client.stream("POST", path, json=payload) as r:
+        out["status"] = r.status_code
+        async for chunk in r.aiter_bytes():
+            _observe(out, chunk, start)
+    out["latency"] = time.perf_counter() - start
+    return out
+
+# ===== Load generation =====
+def _percentiles(values: list[float]) -> dict | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def pick(p):  # nearest-rank
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))]
+
+    return {
+        "p50": round(pick(50), 4), "p95": round(pick(95), 4), "p99": round(pick(99), 4),
+        "mean": round(sum(ordered) / len(ordered), 4), "max": round(ordered[-1], 4),
+    }
+
+async def run_level(call, scenario: str, concurrency: int, total: int, same: bool, cache_mode: str) -> dict:
+    path, make = SCENARIOS[scenario]
+    results = []
+    counter = iter(range(total))
+
+    async def worker():
+        for i in counter:
+            payload = make(i, same)
+            for item in payload.get("items", [payload]):
+                item["cache_mode"] = cache_mode
+            try:
+                results.append(await call(path, payload))
+            except Exception as e:
+                results.append({"status": 0, "latency": 0.0, "first_byte": None, "first_token": None,
+                                "error": True, "exception": repr(e)})
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+
+    errors = [r for r in results if r["error"] or not 200 <= r["status"] < 300]
+    ok = [r for r in results if r not in errors]
+    report = {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": len(results),
+        "errors": len(errors),
+        "wall_s": round(wall, 4),
+        "throughput_rps": round(len(ok) / wall, 3) if wall else None,
+        "latency_s": _percentiles([r["latency"] for r in ok]),
+    }
+    first_tokens = [r["first_token"] for r in ok if r["first_token"] is not None]
+    if first_tokens and scenario.endswith(("stream", "batch")):
+        report["first_token_s"] = _percentiles(first_tokens)
+    return report
+
+async def main(argv=None) -> dict:
+    ap = argparse.ArgumentParser(description="Benchmark the debate API with a mock LLM backend")
+    ap.add_argument("-s", "--scenarios", default=",".join(SCENARIOS), help="comma list of: " + ", ".join(SCENARIOS))
+    ap.add_argument("-c", "--concurrency", default="1,8,32", help="comma list of concurrency levels")
+    ap.add_argument("-n", "--requests", type=int, default=48, help="requests per scenario and level")
+    ap.add_argument("--provider", default="mock", help="LLM_PROVIDER for the in-process app (default: mock)")
+    ap.add_argument("--cache-mode", default="bypass", choices=["default", "refresh", "bypass"])
+    ap.add_argument("--same-bill", action="store_true", help="reuse one bill (exercises cache/coalescing)")
+    ap.add_argument("--url", help="benchmark a running server instead of the in-process app")
+    ap.add_argument("--out", help="write the JSON report here as well as stdout")
+    args = ap.parse_args(argv)
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        ap.error(f"unknown scenarios: {', '.join(unknown)}")
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+
+    close = None
+    if args.url:
+        import httpx
+        client = httpx.AsyncClient(base_url=args.url, timeout=600)
+        call = lambda path, payload: _http_call(client, path, payload)
+        close = client.aclose
+        target = args.url
+    else:
+        # Must be set before the app builds its client
+        os.environ["LLM_PROVIDER"] = args.provider
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        import main as api
+        from llm import init_llm_client, close_llm_client
+        init_llm_client()
+        call = lambda path, payload: _asgi_call(api.app, path, payload)
+        close = close_llm_client
+        target = f"in-process ({args.provider})"
+
+    report = {
+        "target": target,
+        "cache_mode": args.cache_mode,
+        "same_bill": args.same_bill,
+        "mock": {k: v for k, v in os.environ.items() if k.startswith("MOCK_")},
+        "results": [],
+    }
+    try:
+        for scenario in scenarios:
+            for level in levels:
+                report["results"].append(
+                    await run_level(call, scenario, level, args.requests, args.same_bill, args.cache_mode)
+                )
+    finally:
+        await close()
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    return report
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,210 @@
+# backend/cache.py
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from llm import LLMClient, WrappedLLMClient
+
+# ===== Per-request cache mode =====
+# "default": read + write | "refresh": skip read, still write | "bypass": skip both
+CACHE_MODES = {"default", "refresh", "bypass"}
+_cache_mode: ContextVar[str] = ContextVar("cache_mode", default="default")
+
+@contextmanager
+def cache_mode(mode: str | None):
+    token = _cache_mode.set(mode if mode in CACHE_MODES else "default")
+    try:
+        yield
+    finally:
+        _cache_mode.reset(token)
+
+# ===== Tier 1: in-memory LRU with TTL and byte budget =====
+class MemoryCache:
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self._items: OrderedDict[str, tuple[float, str, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires, value, nbytes = item
+            if expires < time.time():
+                del self._items[key]
+                self.size -= nbytes
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str):
+        nbytes = len(key) + len(value.encode("utf-8"))
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old:
+                self.size -= old[2]
+            self._items[key] = (time.time() + self.ttl, value, nbytes)
+            self.size += nbytes
+            while self.size > self.max_bytes:
+                _, (_, _, evicted) = self._items.popitem(last=False)
+                self.size -= evicted
+
+    def __len__(self):
+        return len(self._items)
+
+# ===== Tier 2: SQLite file shared across uvicorn workers =====
+class SQLiteCache:
+    def __init__(self, path: str, ttl: float):
+        self.ttl = ttl
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM llm_cache WHERE key = ? AND expires >= ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires) VALUES (?, ?, ?)", (key, value, now + self.ttl)
+            )
+            self._writes += 1
+            if self._writes % 200 == 0:
+                self._db.execute("DELETE FROM llm_cache WHERE expires < ?", (now,))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+# ===== Caching client =====
+# Wraps another client; completions are keyed on messages + model + sampling params
+class CachedLLMClient(WrappedLLMClient):
+    def __init__(self, inner: LLMClient, memory: MemoryCache, disk: SQLiteCache | None = None):
+        super().__init__(inner)
+        self.memory = memory
+        self.disk = disk
+        self.counters = {"hits_memory": 0, "hits_disk": 0, "misses": 0, "bypassed": 0}
+
+    def _lookup(self, key: str):
+        if _cache_mode.get() != "default":
+            self.counters["bypassed"] += 1
+            return None
+        value = self.memory.get(key)
+        if value is not None:
+            self.counters["hits_memory"] += 1
+            return value
+        if self.disk:
+            value = self.disk.get(key)
+            if value is not None:
+                self.counters["hits_disk"] += 1
+                self.memory.set(key, value)
+                return value
+        self.counters["misses"] += 1
+        return None
+
+    def _store(self, key: str, value):
+        if _cache_mode.get() == "bypass" or not isinstance(value, str) or not value:
+            return
+        self.memory.set(key, value)
+        if self.disk:
+            self.disk.set(key, value)
+
+    def generate(self, messages):
+        key = self.cache_key(messages)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        value = self.inner.generate(messages)
+        self._store(key, value)
+        return value
+
+    async def _alookup(self, key: str):
+        # The disk tier is blocking sqlite; keep it off the event loop
+        return await asyncio.to_thread(self._lookup, key) if self.disk else self._lookup(key)
+
+    async def _astore(self, key: str, value):
+        if self.disk:
+            await asyncio.to_thread(self._store, key, value)
+        else:
+            self._store(key, value)
+
+    async def agenerate(self, messages):
+        key = self.cache_key(messages)
+        cached = await self._alookup(key)
+        if cached is not None:
+            return cached
+        value = await self.inner.agenerate(messages)
+        await self._astore(key, value)
+        return value
+
+    async def agenerate_n(self, messages, n: int) -> list[str]:
+        # The n choices are cached together, under their own key
+        key = f"{self.cache_key(messages)}:n{n}"
+        cached = await self._alookup(key)
+        if cached is not None:
+            return json.loads(cached)
+        values = await self.inner.agenerate_n(messages, n)
+        await self._astore(key, json.dumps(values))
+        return values
+
+    async def astream(self, messages):
+        key = self.cache_key(messages)
+        cached = await self._alookup(key)
+        if cached is not None:
+            yield cached
+            return
+        parts = []
+        async for piece in self.inner.astream(messages):
+            parts.append(piece)
+            yield piece
+        # Only complete streams reach this point
+        await self._astore(key, "".join(parts))
+
+    async def aclose(self):
+        await self.inner.aclose()
+        if self.disk:
+            self.disk.close()
+
+    def stats(self) -> dict:
+        hits = self.counters["hits_memory"] + self.counters["hits_disk"]
+        lookups = hits + self.counters["misses"]
+        return {
+            **self.inner.stats(),
+            "cache": {
+                **self.counters,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self.memory),
+                "memory_bytes": self.memory.size,
+                "memory_max_bytes": self.memory.max_bytes,
+                "disk": bool(self.disk),
+            },
+        }
+
+def build_cache(inner: LLMClient) -> LLMClient:
+    # LLM_CACHE=0 turns caching off entirely; LLM_CACHE_SQLITE=<path> adds the shared disk tier
+    if os.getenv("LLM_CACHE", "1") == "0":
+        return inner
+    ttl = float(os.getenv("LLM_CACHE_TTL", "21600"))
+    memory = MemoryCache(int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024))), ttl)
+    path = os.getenv("LLM_CACHE_SQLITE")
+    return CachedLLMClient(inner, memory, SQLiteCache(path, ttl) if path else None)
@@ -0,0 +1,95 @@
+# backend/digest.py
+import os
+import re
+import asyncio
+import hashlib
+from collections import OrderedDict
+
+from prompts import build_section_summary_prompt
+from tokens import CHARS_PER_TOKEN, estimate_tokens
+
+# Bills above the threshold are summarized section by section (map) and the summaries joined (reduce);
+# the builders then see the compact digest instead of the raw text.
+DIGEST_THRESHOLD_TOKENS = int(os.getenv("BILL_DIGEST_THRESHOLD", "3000"))
+CHUNK_TOKENS = int(os.getenv("BILL_CHUNK_TOKENS", "1500"))
+DIGEST_CONCURRENCY = int(os.getenv("BILL_DIGEST_CONCURRENCY", "4"))
+DIGEST_MAX_ROUNDS = 2
+
+SECTION_RE = re.compile(r"^\s*(?:SECTION|SEC\.|Sec\.|Section|TITLE|Title|§)\s*[\dIVXLC]+", re.MULTILINE)
+
+def _hard_split(text: str, max_tokens: int) -> list[str]:
+    # Last resort for a single huge paragraph: cut on sentence ends, then on characters
+    limit = max_tokens * CHARS_PER_TOKEN
+    parts, cur = [], ""
+    for sentence in re.split(r"(?<=[.;:])\s+", text):
+        while len(sentence) > limit:
+            parts.append(sentence[:limit])
+            sentence = sentence[limit:]
+        if cur and len(cur) + len(sentence) + 1 > limit:
+            parts.append(cur)
+            cur = ""
+        cur = f"{cur} {sentence}" if cur else sentence
+    if cur:
+        parts.append(cur)
+    return parts
+
+def _split_oversized(section: str, max_tokens: int) -> list[str]:
+    if estimate_tokens(section) <= max_tokens:
+        return [section]
+    out = []
+    for para in re.split(r"\n\s*\n", section):
+        out.extend([para] if estimate_tokens(para) <= max_tokens else _hard_split(para, max_tokens))
+    return out
+
+def split_sections(bill: str, max_tokens: int = CHUNK_TOKENS) -> list[str]:
+    # Split on section/title headers, then pack neighbouring pieces up to max_tokens per chunk
+    starts = [m.start() for m in SECTION_RE.finditer(bill)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    pieces = [bill[a:b].strip() for a, b in zip(starts, starts[1:] + [len(bill)])]
+    pieces = [p for piece in pieces if piece for p in _split_oversized(piece, max_tokens)]
+
+    chunks, cur = [], ""
+    for piece in pieces:
+        if cur and estimate_tokens(cur) + estimate_tokens(piece) > max_tokens:
+            chunks.append(cur)
+            cur = ""
+        cur = f"{cur}\n\n{piece}" if cur else piece
+    if cur:
+        chunks.append(cur)
+    return chunks
+
+async def _summarize(client, text: str) -> str:
+    chunks = split_sections(text)
+    sem = asyncio.Semaphore(DIGEST_CONCURRENCY)
+
+    async def one(i: int, chunk: str):
+        async with sem:
+            return await client.agenerate(build_section_summary_prompt(chunk, i, len(chunks)))
+
+    summaries = await asyncio.gather(*(one(i, c) for i, c in enumerate(chunks, 1)))
+    return "\n\n".join(f"[Part {i}/{len(chunks)}]\n{s.strip()}" for i, s in enumerate(summaries, 1))
+
+# Finished digests by bill hash (section calls are also covered by the LLM response cache)
+_digests: OrderedDict[str, str] = OrderedDict()
+_DIGEST_CACHE_SIZE = 256
+
+async def prepare_bill(client, bill: str) -> str:
+    if estimate_tokens(bill) <= DIGEST_THRESHOLD_TOKENS:
+        return bill
+    key = hashlib.sha256(bill.encode("utf-8")).hexdigest()
+    if key in _digests:
+        _digests.move_to_end(key)
+        return _digests[key]
+
+    digest = bill
+    for _ in range(DIGEST_MAX_ROUNDS):
+        digest = await _summarize(client, digest)
+        if estimate_tokens(digest) <= DIGEST_THRESHOLD_TOKENS:
+            break
+    digest = f"[DIGEST of a long bill, condensed section by section]\n{digest}"
+
+    _digests[key] = digest
+    if len(_digests) > _DIGEST_CACHE_SIZE:
+        _digests.popitem(last=False)
+    return digest
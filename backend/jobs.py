@@ -0,0 +1,142 @@
+# backend/jobs.py
+import os
+import json
+import time
+import uuid
+import asyncio
+import hashlib
+
+from metrics import endpoint, log_event, request_id
+
+# Background generation jobs: POST returns an id at once, a bounded worker pool runs the pipeline,
+# and clients poll for status + per-stage partial results. Finished jobs are kept for JOB_TTL seconds.
+
+class JobQueueFull(Exception):
+    pass
+
+class Job:
+    def __init__(self, key: str, request: dict, stages: dict | None = None):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.request = request
+        self.status = "queued"  # queued | running | done | error
+        self.stages: dict[str, str] = dict(stages or {})  # filled in as each LLM stage completes
+        self.result: dict | None = None
+        self.error: str | None = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+
+    def touch(self, status: str | None = None):
+        if status:
+            self.status = status
+        self.updated_at = time.time()
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "stages": self.stages,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+class JobStore:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._jobs: dict[str, Job] = {}
+        self._by_key: dict[str, str] = {}
+
+    def evict(self):
+        # Only finished jobs expire; queued/running ones are still owned by a worker
+        cutoff = time.time() - self.ttl
+        for job_id, job in list(self._jobs.items()):
+            if job.status in ("done", "error") and job.updated_at < cutoff:
+                del self._jobs[job_id]
+                if self._by_key.get(job.key) == job_id:
+                    del self._by_key[job.key]
+
+    def add(self, job: Job):
+        self._jobs[job.id] = job
+        self._by_key[job.key] = job.id
+
+    def get(self, job_id: str) -> Job | None:
+        self.evict()
+        return self._jobs.get(job_id)
+
+    def by_key(self, key: str) -> Job | None:
+        self.evict()
+        job_id = self._by_key.get(key)
+        return self._jobs.get(job_id) if job_id else None
+
+    def __len__(self):
+        return len(self._jobs)
+
+class JobQueue:
+    def __init__(self, runner, workers: int, max_queued: int, ttl: float):
+        # runner(request: dict, stages: dict) -> result dict; it records finished stages into `stages`
+        self.runner = runner
+        self.workers = workers
+        self.store = JobStore(ttl)
+        self.queue: asyncio.Queue[Job] = asyncio.Queue(maxsize=max_queued)
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    @staticmethod
+    def key_for(request: dict) -> str:
+        return hashlib.sha256(json.dumps(request, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def submit(self, request: dict) -> Job:
+        key = self.key_for(request)
+        existing = self.store.by_key(key)
+        if existing and existing.status != "error":
+            # Same request already queued, running or finished: share it
+            return existing
+        # A retry after failure starts from whatever stages the failed attempt finished
+        job = Job(key, request, stages=existing.stages if existing else None)
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise JobQueueFull("Job queue is full; retry shortly")
+        self.store.add(job)
+        return job
+
+    async def _worker(self):
+        while True:
+            job = await self.queue.get()
+            endpoint.set("/api/jobs")
+            request_id.set(job.id[:16])
+            job.touch("running")
+            try:
+                job.result = await self.runner(job.request, job.stages)
+                job.touch("done")
+            except asyncio.CancelledError:
+                job.error = "cancelled (server shutting down)"
+                job.touch("error")
+                raise
+            except Exception as e:
+                job.error = getattr(e, "detail", None) or str(e)
+                job.touch("error")
+            finally:
+                log_event("job", job_id=job.id, status=job.status, stages=list(job.stages))
+                self.queue.task_done()
+
+    def stats(self) -> dict:
+        return {"workers": self.workers, "queued": self.queue.qsize(), "stored": len(self.store)}
+
+def build_job_queue(runner) -> JobQueue:
+    return JobQueue(
+        runner,
+        workers=int(os.getenv("JOB_WORKERS", "4")),
+        max_queued=int(os.getenv("JOB_MAX_QUEUED", "200")),
+        ttl=float(os.getenv("JOB_TTL", "3600")),
+    )
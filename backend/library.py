@@ -0,0 +1,278 @@
+# backend/library.py
+import os
+import sys
+import json
+import time
+import asyncio
+import sqlite3
+import argparse
+import threading
+from datetime import datetime
+
+from metrics import endpoint, log_event, request_id
+from textsim import fingerprint, normalize, shingles, sketch, sketch_similarity
+
+# Precomputed bill library: docket bills are ingested ahead of a tournament (API or CLI), a throttled
+# background worker pre-generates packages for common option combos off-peak, and /api/generate checks
+# here first. Bills match on normalized text (whitespace, quotes, markdown do not matter). Sketch
+# similarity is opt-in (LIBRARY_MATCH < 1): a one-word amendment scores ~0.97, and an amended bill must
+# not be served the package for the original.
+
+# Request fields that change the generated output; everything else (cache_mode, session_id) does not
+OPTION_FIELDS = (
+    "speech_minutes", "style", "novelty", "return_qx", "return_full_speeches", "polish", "polish_mode",
+    "custom_instructions", "variants",
+)
+
+def options_key(options: dict) -> str:
+    return json.dumps({f: options.get(f) for f in OPTION_FIELDS}, sort_keys=True)
+
+class BillLibrary:
+    def __init__(self, path: str, match_threshold: float = 1.0):
+        self.match_threshold = match_threshold
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS bills (fingerprint TEXT PRIMARY KEY, bill TEXT NOT NULL, "
+            "signature TEXT NOT NULL, docket TEXT, added_at REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS packages (fingerprint TEXT NOT NULL, options TEXT NOT NULL, "
+            "result TEXT NOT NULL, created_at REAL NOT NULL, PRIMARY KEY (fingerprint, options))"
+        )
+        self._signatures: dict[str, list[int]] = {}
+        self.counters = {"hits_exact": 0, "hits_fuzzy": 0, "misses": 0, "stored": 0}
+        self.reload()
+
+    def reload(self):
+        # Picks up bills added by the CLI (or another worker) since the last load
+        with self._lock:
+            rows = self._db.execute("SELECT fingerprint, signature FROM bills").fetchall()
+        self._signatures = {fp: json.loads(sig) for fp, sig in rows}
+
+    def add_bill(self, bill: str, docket: str | None = None) -> tuple[str, bool]:
+        fp = fingerprint(bill)
+        if fp in self._signatures:
+            return fp, False
+        signature = sketch(shingles(bill))
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO bills (fingerprint, bill, signature, docket, added_at) VALUES (?, ?, ?, ?, ?)",
+                (fp, bill, json.dumps(signature), docket, time.time()),
+            )
+            self._signatures[fp] = signature
+        return fp, True
+
+    def has(self, fp: str) -> bool:
+        return fp in self._signatures
+
+    def match(self, bill: str) -> tuple[str | None, float]:
+        # (fingerprint, similarity): exact on normalized text first, then the closest signature
+        if not self._signatures:
+            return None, 0.0
+        fp = fingerprint(bill)
+        if fp in self._signatures:
+            return fp, 1.0
+        if self.match_threshold >= 1.0:
+            return None, 0.0
+        signature = sketch(shingles(bill))
+        # Snapshot: docket ingestion adds bills from the threadpool while this runs on the event loop
+        with self._lock:
+            candidates = list(self._signatures.items())
+        best, score = None, 0.0
+        for other, sig in candidates:
+            s = sketch_similarity(signature, sig)
+            if s > score:
+                best, score = other, s
+        return (best, score) if score >= self.match_threshold else (None, score)
+
+    def get(self, fp: str, options: dict) -> dict | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT result FROM packages WHERE fingerprint = ? AND options = ?", (fp, options_key(options))
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def lookup(self, bill: str, options: dict) -> tuple[dict | None, str | None, float]:
+        fp, score = self.match(bill)
+        result = self.get(fp, options) if fp else None
+        if result is None:
+            self.counters["misses"] += 1
+            return None, fp, score
+        self.counters["hits_exact" if score == 1.0 else "hits_fuzzy"] += 1
+        return result, fp, score
+
+    def put(self, fp: str, options: dict, result: dict):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO packages (fingerprint, options, result, created_at) VALUES (?, ?, ?, ?)",
+                (fp, options_key(options), json.dumps(result), time.time()),
+            )
+        self.counters["stored"] += 1
+
+    def missing(self, combos: list[dict]):
+        # (fingerprint, bill, options) still to pre-generate, oldest bills first
+        with self._lock:
+            bills = self._db.execute("SELECT fingerprint, bill FROM bills ORDER BY added_at").fetchall()
+            done = set(self._db.execute("SELECT fingerprint, options FROM packages").fetchall())
+        for fp, bill in bills:
+            for options in combos:
+                if (fp, options_key(options)) not in done:
+                    yield fp, bill, options
+
+    def stats(self) -> dict:
+        with self._lock:
+            packages = self._db.execute("SELECT COUNT(*) FROM packages").fetchone()[0]
+        return {"bills": len(self._signatures), "packages": packages, **self.counters}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+# ===== Warm-up worker =====
+def _hours(spec: str) -> tuple[int, int] | None:
+    # "1-6" = 01:00 to 05:59 local time; "22-6" wraps midnight; "" = any time
+    if not spec.strip():
+        return None
+    start, _, end = spec.partition("-")
+    return int(start), int(end)
+
+class WarmupWorker:
+    def __init__(self, library: BillLibrary, runner, combos: list[dict], idle, interval: float,
+                 hours: tuple[int, int] | None, max_attempts: int = 3):
+        # runner(bill, options) generates through the normal pipeline, which stores library bills' results
+        # (returns None when nothing was stored, e.g. degraded); idle() -> True when live traffic leaves room
+        self.library = library
+        self.runner = runner
+        self.combos = combos
+        self.idle = idle
+        self.interval = interval
+        self.hours = hours
+        self.max_attempts = max_attempts
+        self.failures: dict[tuple[str, str], int] = {}
+        self.generated = 0
+        self._task: asyncio.Task | None = None
+
+    def off_peak(self) -> bool:
+        if self.hours is None:
+            return True
+        start, end = self.hours
+        hour = datetime.now().hour
+        return start <= hour < end if start <= end else hour >= start or hour < end
+
+    def _next(self):
+        for fp, bill, options in self.library.missing(self.combos):
+            if self.failures.get((fp, options_key(options)), 0) < self.max_attempts:
+                return fp, bill, options
+        return None
+
+    async def step(self) -> bool:
+        # One pre-generation; False when there was nothing to do or it was not the time
+        if not self.off_peak() or not self.idle():
+            return False
+        self.library.reload()
+        job = self._next()
+        if job is None:
+            return False
+        fp, bill, options = job
+        try:
+            result = await self.runner(bill, options)
+        except Exception as e:
+            key = (fp, options_key(options))
+            self.failures[key] = self.failures.get(key, 0) + 1
+            log_event("library_warmup_failed", fingerprint=fp[:16], error=str(getattr(e, "detail", e)))
+            return False
+        if result is not None:
+            self.generated += 1
+        return True
+
+    async def _run(self):
+        endpoint.set("/api/library/warmup")
+        while True:
+            await asyncio.sleep(self.interval)
+            request_id.set("warmup")
+            await self.step()
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> dict:
+        return {"off_peak": self.off_peak(), "generated": self.generated, "failed": len(self.failures)}
+
+def _csv(name: str, default: str) -> list[str]:
+    return [v.strip() for v in os.getenv(name, default).split(",") if v.strip()]
+
+def warmup_combos() -> list[dict]:
+    # Common style/novelty/minutes presets to pre-generate; the rest of the options stay at request defaults
+    return [
+        {"style": style, "novelty": novelty, "speech_minutes": int(minutes),
+         "return_full_speeches": os.getenv("LIBRARY_FULL_SPEECHES", "0") == "1"}
+        for style in _csv("LIBRARY_STYLES", "nationals,razor")
+        for novelty in _csv("LIBRARY_NOVELTY", "standard,high")
+        for minutes in _csv("LIBRARY_MINUTES", "2,3")
+    ]
+
+def build_library() -> BillLibrary | None:
+    # LIBRARY_DB=<path> turns the library on; LIBRARY_MATCH=1 (default) serves exact normalized matches only
+    path = os.getenv("LIBRARY_DB")
+    if not path:
+        return None
+    return BillLibrary(path, match_threshold=float(os.getenv("LIBRARY_MATCH", "1")))
+
+def build_warmup(library: BillLibrary, runner, combos: list[dict], idle) -> WarmupWorker:
+    return WarmupWorker(
+        library, runner, combos, idle,
+        interval=float(os.getenv("LIBRARY_WARMUP_INTERVAL", "30")),
+        hours=_hours(os.getenv("LIBRARY_WARMUP_HOURS", "1-6")),
+    )
+
+# ===== CLI =====
+#   LIBRARY_DB=library.db python library.py ingest docket.txt --docket "State 2026"
+#   LIBRARY_DB=library.db python library.py stats
+# A docket file is a JSON list of bill texts, or plain text with bills separated by lines of "---".
+def read_docket(text: str) -> list[str]:
+    if text.lstrip().startswith("["):
+        return [b for b in json.loads(text) if isinstance(b, str) and b.strip()]
+    bills, current = [], []
+    for line in text.splitlines():
+        if line.strip() == "---":
+            bills.append("\n".join(current))
+            current = []
+        else:
+            current.append(line)
+    bills.append("\n".join(current))
+    return [b.strip() for b in bills if normalize(b)]
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Manage the precomputed bill library")
+    ap.add_argument("--db", default=os.getenv("LIBRARY_DB"), help="SQLite path (default: $LIBRARY_DB)")
+    sub = ap.add_subparsers(dest="command", required=True)
+    ingest = sub.add_parser("ingest", help="add a docket's bills; the server's warm-up worker pre-generates them")
+    ingest.add_argument("file", help="docket file ('-' for stdin)")
+    ingest.add_argument("--docket", help="docket name to record with each bill")
+    sub.add_parser("stats", help="print bill and package counts")
+    args = ap.parse_args(argv)
+    if not args.db:
+        ap.error("set --db or LIBRARY_DB")
+
+    library = BillLibrary(args.db)
+    try:
+        if args.command == "ingest":
+            text = sys.stdin.read() if args.file == "-" else open(args.file, encoding="utf-8").read()
+            added = [library.add_bill(bill, args.docket) for bill in read_docket(text)]
+            out = {"bills": len(added), "added": sum(new for _, new in added)}
+        else:
+            out = library.stats()
+        print(json.dumps(out, indent=2))
+    finally:
+        library.close()
+
+if __name__ == "__main__":
+    main()
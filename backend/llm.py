@@ -1,39 +1,171 @@
 import os
+import json
+import time
+import asyncio
+import hashlib
+import httpx
 import requests
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
+
+from metrics import LLM_CALLS, LLM_INFLIGHT, LLM_SECONDS, record_usage
 
 load_dotenv()
 
+def _pool_limits() -> httpx.Limits:
+    # Shared connection budget for every upstream LLM call in this process
+    return httpx.Limits(
+        max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "100")),
+        max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE", "20")),
+        keepalive_expiry=float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30")),
+    )
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(float(os.getenv("LLM_TIMEOUT", "180")), connect=10.0)
+
 class LLMClient:
+    native_n = False  # agenerate_n is one upstream request (provider `n`), not n separate calls
+
     def generate(self, messages):
         raise NotImplementedError
 
+    async def agenerate(self, messages):
+        # Fallback for clients without a native async path
+        return await asyncio.to_thread(self.generate, messages)
+
+    async def astream(self, messages):
+        # Token stream; clients without native streaming yield the whole completion once
+        yield await self.agenerate(messages)
+
+    async def agenerate_n(self, messages, n: int) -> list[str]:
+        # n independent completions; providers with a native `n` override this to share one prompt
+        return list(await asyncio.gather(*(self.agenerate(messages) for _ in range(n))))
+
+    async def aclose(self):
+        pass
+
+    def stats(self) -> dict:
+        # Wrapper layers (cache, single-flight, ...) add their own section
+        return {}
+
+    def fingerprint(self) -> dict:
+        # Everything besides the messages that shapes the completion (model, sampling)
+        return {"client": type(self).__name__, "model": getattr(self, "model", None)}
+
+    def cache_key(self, messages) -> str:
+        blob = json.dumps({"fp": self.fingerprint(), "messages": messages}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+# Base for the wrapper layers (instrumentation, rate limit, single-flight, cache): anything a layer
+# does not override passes straight through to the client it wraps
+class WrappedLLMClient(LLMClient):
+    def __init__(self, inner: LLMClient):
+        self.inner = inner
+
+    @property
+    def native_n(self) -> bool:
+        return self.inner.native_n
+
+    def generate(self, messages):
+        return self.inner.generate(messages)
+
+    async def agenerate(self, messages):
+        return await self.inner.agenerate(messages)
+
+    async def agenerate_n(self, messages, n: int) -> list[str]:
+        return await self.inner.agenerate_n(messages, n)
+
+    async def astream(self, messages):
+        async for piece in self.inner.astream(messages):
+            yield piece
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+    def stats(self) -> dict:
+        return self.inner.stats()
+
+    def fingerprint(self) -> dict:
+        return self.inner.fingerprint()
+
+    def cache_key(self, messages) -> str:
+        return self.inner.cache_key(messages)
+
 class OpenAIClient(LLMClient):
+    provider = "openai"
+    native_n = True
+    SAMPLING = dict(
+        temperature=0.85,       # creative
+        top_p=0.9,
+        presence_penalty=0.4,
+        frequency_penalty=0.1,
+    )
+
     def __init__(self, model=None):
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise RuntimeError("OPENAI_API_KEY missing in environment/.env")
-        self.client = OpenAI(api_key=api_key)
+        self.client = OpenAI(
+            api_key=api_key,
+            http_client=httpx.Client(limits=_pool_limits(), timeout=_timeout()),
+        )
+        self.aclient = AsyncOpenAI(
+            api_key=api_key,
+            http_client=httpx.AsyncClient(limits=_pool_limits(), timeout=_timeout()),
+        )
         self.model = model or os.getenv("OPENAI_MODEL", "gpt-4o")
 
+    def _params(self, messages):
+        return dict(model=self.model, messages=messages, **self.SAMPLING)
+
+    def fingerprint(self) -> dict:
+        return {**super().fingerprint(), **self.SAMPLING}
+
+    def _usage(self, usage):
+        if usage is not None:
+            record_usage(self.provider, self.model, usage.prompt_tokens, usage.completion_tokens)
+
     def generate(self, messages):
-        resp = self.client.chat.completions.create(
-            model=self.model,
-            messages=messages,
-            temperature=0.85,       # creative
-            top_p=0.9,
-            presence_penalty=0.4,
-            frequency_penalty=0.1,
-        )
+        resp = self.client.chat.completions.create(**self._params(messages))
+        self._usage(resp.usage)
+        return resp.choices[0].message.content
+
+    async def agenerate(self, messages):
+        resp = await self.aclient.chat.completions.create(**self._params(messages))
+        self._usage(resp.usage)
         return resp.choices[0].message.content
 
+    async def agenerate_n(self, messages, n: int) -> list[str]:
+        # One request: the prompt is sent (and billed) once for all n choices
+        resp = await self.aclient.chat.completions.create(**self._params(messages), n=n)
+        self._usage(resp.usage)
+        return [c.message.content for c in resp.choices]
+
+    async def astream(self, messages):
+        stream = await self.aclient.chat.completions.create(
+            **self._params(messages), stream=True, stream_options={"include_usage": True}
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+            # Final chunk has no choices, only usage
+            self._usage(getattr(chunk, "usage", None))
+
+    async def aclose(self):
+        self.client.close()
+        await self.aclient.close()
+
 class OllamaClient(LLMClient):
-    def __init__(self, model=None):
-        self.base = "http://127.0.0.1:11434"
+    provider = "ollama"
+    OPTIONS = {"temperature": 0.95, "top_p": 0.9}
+
+    def __init__(self, model=None, base=None):
+        self.base = (base or os.getenv("OLLAMA_BASE_URL", "http://127.0.0.1:11434")).rstrip("/")
         self.model = model or os.getenv("OLLAMA_MODEL", "llama3")
+        self.session = requests.Session()
+        self.aclient = httpx.AsyncClient(base_url=self.base, limits=_pool_limits(), timeout=_timeout())
 
-    def generate(self, messages):
+    def _payload(self, messages, stream=False):
         # Flatten OpenAI-style messages to a single chat for Ollama
         text = []
         for m in messages:
@@ -43,15 +175,18 @@ class OllamaClient(LLMClient):
                 text.append(f"[SYSTEM]\n{content}\n")
             else:
                 text.append(content)
-        payload = {
+        return {
             "model": self.model,
             "messages": [{"role": "user", "content": "\n".join(text)}],
-            "stream": False,
-            "options": {"temperature": 0.95, "top_p": 0.9},
+            "stream": stream,
+            "options": self.OPTIONS,
+            # Keep the model (and its KV cache for the shared prompt prefix) resident between calls
+            "keep_alive": os.getenv("OLLAMA_KEEP_ALIVE", "30m"),
         }
-        r = requests.post(f"{self.base}/api/chat", json=payload, timeout=180)
-        r.raise_for_status()
-        data = r.json()
+
+    def _content(self, data):
+        if data.get("done", True):
+            record_usage(self.provider, self.model, data.get("prompt_eval_count"), data.get("eval_count"))
         # Newer Ollama returns conversation; fallback to message.content if present
         if "message" in data and "content" in data["message"]:
             return data["message"]["content"]
@@ -60,8 +195,144 @@ class OllamaClient(LLMClient):
             return data["content"]
         return str(data)
 
-def get_llm_client() -> LLMClient:
+    def generate(self, messages):
+        r = self.session.post(f"{self.base}/api/chat", json=self._payload(messages),
+                              timeout=float(os.getenv("LLM_TIMEOUT", "180")))
+        r.raise_for_status()
+        return self._content(r.json())
+
+    async def agenerate(self, messages):
+        r = await self.aclient.post("/api/chat", json=self._payload(messages))
+        r.raise_for_status()
+        return self._content(r.json())
+
+    async def astream(self, messages):
+        # Ollama streams NDJSON: one {"message": {"content": ...}, "done": bool} object per line
+        async with self.aclient.stream("POST", "/api/chat", json=self._payload(messages, stream=True)) as r:
+            r.raise_for_status()
+            async for line in r.aiter_lines():
+                if not line.strip():
+                    continue
+                data = json.loads(line)
+                if data.get("error"):
+                    raise RuntimeError(data["error"])
+                piece = data.get("message", {}).get("content", "")
+                if piece:
+                    yield piece
+                if data.get("done"):
+                    record_usage(self.provider, self.model, data.get("prompt_eval_count"), data.get("eval_count"))
+                    break
+
+    async def aclose(self):
+        self.session.close()
+        await self.aclient.aclose()
+
+    def fingerprint(self) -> dict:
+        return {**super().fingerprint(), **self.OPTIONS}
+
+# Per-call latency, outcome and in-flight gauge for one provider client
+class InstrumentedLLMClient(WrappedLLMClient):
+    def __init__(self, inner: LLMClient):
+        super().__init__(inner)
+        self.labels = (getattr(inner, "provider", type(inner).__name__), str(getattr(inner, "model", "")))
+
+    def _done(self, start: float, outcome: str):
+        LLM_INFLIGHT.dec()
+        LLM_CALLS.inc(*self.labels, outcome)
+        LLM_SECONDS.observe(*self.labels, value=time.perf_counter() - start)
+
+    def generate(self, messages):
+        LLM_INFLIGHT.inc()
+        start, outcome = time.perf_counter(), "error"
+        try:
+            result = self.inner.generate(messages)
+            outcome = "ok"
+            return result
+        finally:
+            self._done(start, outcome)
+
+    async def agenerate(self, messages):
+        LLM_INFLIGHT.inc()
+        start, outcome = time.perf_counter(), "error"
+        try:
+            result = await self.inner.agenerate(messages)
+            outcome = "ok"
+            return result
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            self._done(start, outcome)
+
+    async def agenerate_n(self, messages, n: int) -> list[str]:
+        LLM_INFLIGHT.inc()
+        start, outcome = time.perf_counter(), "error"
+        try:
+            result = await self.inner.agenerate_n(messages, n)
+            outcome = "ok"
+            return result
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            self._done(start, outcome)
+
+    async def astream(self, messages):
+        LLM_INFLIGHT.inc()
+        start, outcome = time.perf_counter(), "error"
+        try:
+            async for piece in self.inner.astream(messages):
+                yield piece
+            outcome = "ok"
+        except (asyncio.CancelledError, GeneratorExit):
+            outcome = "cancelled"
+            raise
+        finally:
+            self._done(start, outcome)
+
+def build_provider(provider: str, model=None, base=None) -> LLMClient:
+    from ratelimit import build_rate_limit
+
+    if provider == "mock":
+        from mock_llm import mock_from_env
+        client = mock_from_env(model)
+    elif provider == "ollama":
+        client = OllamaClient(model, base=base)
+    else:
+        client = OpenAIClient(model)
+    # rate limit -> instrumentation -> provider: queue wait is not counted as call latency
+    return build_rate_limit(InstrumentedLLMClient(client), provider)
+
+def build_llm_client() -> LLMClient:
+    from cache import build_cache
+    from singleflight import CoalescingLLMClient
+
     provider = (os.getenv("LLM_PROVIDER", "openai") or "openai").lower()
-    if provider == "ollama":
-        return OllamaClient()
-    return OpenAIClient()
+    if provider == "router":
+        # Several backends (LLM_BACKENDS), each with its own rate limit, behind one latency-aware router
+        from router import build_router
+        client = build_router()
+    else:
+        if provider not in ("ollama", "mock"):
+            provider = "openai"
+        client = build_provider(provider)
+    # cache -> single-flight -> [router ->] rate limit -> provider: only real upstream calls spend the budget
+    return build_cache(CoalescingLLMClient(client))
+
+# One process-wide client (and connection pool), built at startup
+_client: LLMClient | None = None
+
+def init_llm_client() -> LLMClient:
+    global _client
+    if _client is None:
+        _client = build_llm_client()
+    return _client
+
+def get_llm_client() -> LLMClient:
+    return _client or init_llm_client()
+
+async def close_llm_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -1,22 +1,55 @@
 import os
-from fastapi import FastAPI, HTTPException
+import json
+import time
+import asyncio
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
+from contextlib import asynccontextmanager, nullcontext
 from dotenv import load_dotenv
 
-from llm import get_llm_client
+from llm import get_llm_client, init_llm_client, close_llm_client
+from admission import NORMAL, Overloaded, admission, generate_calls
+from cache import cache_mode
+from jobs import JobQueueFull, build_job_queue
+from library import OPTION_FIELDS, build_library, build_warmup, warmup_combos
+from digest import prepare_bill
+from po import fallback_text, merge_llm, parse_po
+from postprocess import Review
+from variants import rank_variants
+from sessions import Session, build_session_store
+from textsim import fingerprint
+from metrics import (
+    ADMISSION, POLISH, QUEUE_WAIT, REQUESTS, REQUEST_SECONDS,
+    endpoint, log_event, new_request_id, render, request_id, setup_logging, span,
+)
 from prompts import (
     build_argument_prompt,
     build_po_prompt,
     build_speech_prompt,
     build_polish_prompt,
     build_chat_prompt,   # NEW
+    prompt_token_report,
 )
 
 load_dotenv()
+setup_logging()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_llm_client()
+    jobs.start()
+    if warmup:
+        warmup.start()
+    yield
+    if warmup:
+        await warmup.stop()
+    await jobs.stop()
+    await close_llm_client()
 
-app = FastAPI(title="Debate Argument Generator API", version="0.5.0")
+app = FastAPI(title="Debate Argument Generator API", version="0.5.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -29,6 +62,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def observe(request: Request, call_next):
+    # Request ID + endpoint label for spans/logs; latency and status per endpoint
+    rid = request.headers.get("x-request-id") or new_request_id()
+    request_id.set(rid)
+    endpoint.set(request.url.path)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        seconds = time.perf_counter() - start
+        # Route template, not the raw path: unmatched paths (scanners) must not mint new series
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        REQUESTS.inc(route, str(status))
+        REQUEST_SECONDS.observe(route, value=seconds)
+        log_event("request", method=request.method, status=status, seconds=round(seconds, 4))
+    response.headers["X-Request-ID"] = rid
+    return response
+
+# Keep proxies (nginx etc.) from buffering token streams
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
 class GenerateBody(BaseModel):
     bill: str
     speech_minutes: int = 2
@@ -37,77 +94,583 @@ class GenerateBody(BaseModel):
     return_qx: bool = True
     return_full_speeches: bool = False
     polish: bool = True
+    polish_mode: str = "auto"  # "auto" = only sections failing the local review | "always" = whole draft
     custom_instructions: Optional[str] = None  # NEW
+    cache_mode: str = "default"  # "default" | "refresh" | "bypass"
+    session_id: Optional[str] = None  # keep the package as context for this chat session
+    variants: int = 1  # >1: draft N packages in one round, return the best plus the ranked list
+
+class BatchBody(BaseModel):
+    items: list[GenerateBody]
+    concurrency: Optional[int] = None  # parallel bills; defaults to BATCH_CONCURRENCY
 
 class POBody(BaseModel):
     text: str
+    llm_fallback: bool = True  # False = rules only, never waits on the LLM
 
 class ChatBody(BaseModel):
     message: str
-    bill: Optional[str] = None
+    bill: Optional[str] = None  # with a session: only needed when the bill changes
     style: str = "razor"
     novelty: str = "standard"
+    cache_mode: str = "default"
+    session_id: Optional[str] = None
+
+class SessionBody(BaseModel):
+    bill: Optional[str] = None
+
+class DocketBody(BaseModel):
+    bills: list[str]
+    docket: Optional[str] = None  # e.g. tournament name, recorded with each bill
 
 @app.get("/health")
 def health():
     return {"ok": True}
 
-@app.post("/api/generate")
-def generate(body: GenerateBody):
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(render(get_llm_client().stats()), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/llm/stats")
+def llm_stats():
+    return {"ok": True, **get_llm_client().stats(), "admission": admission.stats(), "jobs": jobs.stats(),
+            "sessions": sessions.stats()}
+
+@app.get("/api/prompts/report")
+def prompts_report():
+    # Input tokens each builder spends on boilerplate (bill left empty) and how much of it is a shared prefix
+    return {"ok": True, "builders": prompt_token_report()}
+
+@app.get("/api/cache/stats")
+def cache_stats():
+    stats = get_llm_client().stats().get("cache")
+    if stats is None:
+        return {"ok": True, "enabled": False}
+    return {"ok": True, "enabled": True, **stats}
+
+async def _run_stage(client, prompt, stage: str, stages: dict) -> str:
+    # Stages finished by an earlier attempt (job retries) are reused as-is
+    if stage not in stages:
+        with span(stage):
+            stages[stage] = await client.agenerate(prompt)
+    return stages[stage]
+
+def _polish_prompt(text: str, body: GenerateBody, issues: Optional[list] = None):
+    instructions = body.custom_instructions
+    if issues:
+        fixes = "Fix what the reviewer flagged: " + "; ".join(issues) + "."
+        instructions = f"{instructions.strip()}\n{fixes}" if instructions else fixes
+    return build_polish_prompt(text, style=body.style, custom_instructions=instructions)
+
+async def _review_polish(client, text: str, name: str, body: GenerateBody) -> Optional[str]:
+    # polish_mode "auto": local checks first, then polish only the failing sections (None = nothing failed)
+    stage = f"{name}_polish"
+    review = Review(text, name, body.speech_minutes)
+    POLISH.inc(stage, "sections" if review.failing else "skipped")
+    log_event("review", stage=name, issues=review.to_dict())
+    if not review.failing:
+        return None
+    with span(stage):
+        polished = await asyncio.gather(*(
+            client.agenerate(_polish_prompt(review.sections[i][1], body, review.issues[i])) for i in review.failing
+        ))
+    return review.splice(dict(zip(review.failing, polished)))
+
+VARIANTS_MAX = int(os.getenv("VARIANTS_MAX", "5"))
+
+async def _run_variants(client, prompt, body: GenerateBody, stages: dict) -> str:
+    # N package drafts in one round (provider `n`, or parallel calls), ranked locally; the best goes on
+    if "package_variants" not in stages:
+        with span("package_variants"):
+            texts = await client.agenerate_n(prompt, body.variants)
+        ranked, dropped = rank_variants(texts)
+        if not ranked:
+            raise RuntimeError("no usable variants")
+        stages["package_variants"] = {"variants": ranked, "duplicates_dropped": dropped}
+        stages["package"] = ranked[0]["text"]
+    return stages["package"]
+
+async def _polish_stage(client, text: str, name: str, body: GenerateBody, stages: dict) -> str:
+    stage = f"{name}_polish"
+    if body.polish_mode == "always":
+        POLISH.inc(stage, "full")
+        return await _run_stage(client, _polish_prompt(text, body), stage, stages)
+    if stage not in stages:
+        stages[stage] = await _review_polish(client, text, name, body) or text
+    return stages[stage]
+
+class ChainError(Exception):
+    pass
+
+async def _run_chain(client, prompt, name: str, body: GenerateBody, stages: Optional[dict] = None):
+    # One chain = first draft, then (optionally) a polish pass over the whole draft or its failing sections
+    stages = {} if stages is None else stages
+    stage = name
+    try:
+        if name == "package" and body.variants > 1:
+            text = await _run_variants(client, prompt, body, stages)
+        else:
+            text = await _run_stage(client, prompt, name, stages)
+        if not body.polish:
+            return text
+        stage = f"polish {name}"
+        return await _polish_stage(client, text, name, body, stages)
+    except Exception as e:
+        raise ChainError(f"LLM error ({stage}): {e}") from e
+
+def _require_bill(body: GenerateBody):
     if not body.bill or not body.bill.strip():
         raise HTTPException(400, "Bill text required")
+    if not 1 <= body.variants <= VARIANTS_MAX:
+        raise HTTPException(400, f"variants must be between 1 and {VARIANTS_MAX}")
 
-    client = get_llm_client()
+def _overloaded(e: Overloaded) -> HTTPException:
+    return HTTPException(429, str(e), headers={"Retry-After": str(e.retry_after)})
 
-    # 1) Argument package
-    pkg_prompt = build_argument_prompt(
-        body.bill, body.speech_minutes, body.style, body.return_qx, body.novelty, body.custom_instructions
-    )
+def _admit(body: GenerateBody) -> tuple[GenerateBody, list[str]]:
+    # Under load: shed polish first, then full speeches; past the hard limit, 429 + Retry-After
+    try:
+        polish, speeches, degraded = admission.plan_generate(body.polish, body.return_full_speeches)
+    except Overloaded as e:
+        raise _overloaded(e)
+    return body.model_copy(update={"polish": polish, "return_full_speeches": speeches}), degraded
+
+def _admit_call():
+    try:
+        admission.admit_call()
+    except Overloaded as e:
+        raise _overloaded(e)
+
+async def _prepare_bill(client, bill: str) -> str:
+    # Long bills are condensed once into a digest that every stage reuses
     try:
-        pkg_text = client.generate(pkg_prompt)
+        with span("digest"):
+            return await prepare_bill(client, bill)
     except Exception as e:
-        raise HTTPException(500, f"LLM error (package): {e}")
+        raise HTTPException(500, f"LLM error (digest): {e}")
 
-    # 1b) Polish package (optional)
-    if body.polish:
-        try:
-            pol_prompt = build_polish_prompt(pkg_text, style=body.style, custom_instructions=body.custom_instructions)
-            pkg_text = client.generate(pol_prompt)
-        except Exception as e:
-            raise HTTPException(500, f"LLM error (polish package): {e}")
+async def _chain_prompts(body: GenerateBody, client) -> dict:
+    bill = await _prepare_bill(client, body.bill)
 
-    # 2) Full speeches (optional)
-    speeches_text = None
+    # 1) Argument package
+    prompts = {
+        "package": build_argument_prompt(
+            bill, body.speech_minutes, body.style, body.return_qx, body.novelty, body.custom_instructions
+        )
+    }
+    # 2) Full speeches (optional) -- independent of the package, so run side by side
     if body.return_full_speeches:
-        sp_prompt = build_speech_prompt(
-            body.bill, body.speech_minutes, body.style, body.novelty, body.custom_instructions
+        prompts["speeches"] = build_speech_prompt(
+            bill, body.speech_minutes, body.style, body.novelty, body.custom_instructions
         )
+    return prompts
+
+async def _generate_result(body: GenerateBody, client, stages: Optional[dict] = None,
+                           background: bool = False) -> dict:
+    _require_bill(body)
+    stages = {} if stages is None else stages
+    session = _context_session(body.session_id)
+    hit = _library_hit(body)
+    if hit:
+        if session:
+            await _remember_package(session, client, body.bill, hit["result"])
+        return {**hit, **_session_ref(body, session)}
+    if background:
+        await admission.wait_normal()
+        degraded = []
+    else:
+        body, degraded = _admit(body)
+    with admission.track(generate_calls(body.polish, body.return_full_speeches, body.variants)), cache_mode(body.cache_mode):
+        prompts = await _chain_prompts(body, client)
+        chains = {
+            name: _run_chain(client, prompt, name, body, stages)
+            for name, prompt in prompts.items()
+        }
+        results = dict(zip(chains, await asyncio.gather(*chains.values(), return_exceptions=True)))
+
+    # A failed chain is reported per chain; the other chain's finished text is still returned
+    errors = {name: str(res) for name, res in results.items() if isinstance(res, Exception)}
+    if len(errors) == len(results):
+        raise HTTPException(500, "; ".join(errors.values()))
+    final = {name: None if name in errors else res for name, res in results.items()}
+
+    if session and final["package"] is not None:
+        await _remember_package(session, client, body.bill, final["package"])
+    result = {"ok": not errors, "result": final["package"], "speeches": final.get("speeches"),
+              **stages.get("package_variants", {}), **_session_ref(body, session)}
+    if errors:
+        result["errors"] = errors
+    if degraded:
+        result["degraded"] = degraded
+    elif not errors:
+        _library_store(body, result)
+    return result
+
+@app.post("/api/generate")
+async def generate(body: GenerateBody):
+    return await _generate_result(body, get_llm_client())
+
+# ===== Jobs (long generations without holding the connection) =====
+async def _run_job(request: dict, stages: dict) -> dict:
+    # Queued jobs absorb load: they wait for admission instead of being degraded or rejected
+    result = await _generate_result(GenerateBody(**request), get_llm_client(), stages, background=True)
+    if result.get("errors"):
+        # Fail the job so a resubmit retries the failed chain from the stages already finished
+        raise RuntimeError("; ".join(result["errors"].values()))
+    return result
+
+jobs = build_job_queue(_run_job)
+
+@app.post("/api/jobs", status_code=202)
+async def create_job(body: GenerateBody):
+    _require_bill(body)
+    try:
+        job = jobs.submit(body.model_dump())
+    except JobQueueFull as e:
+        raise HTTPException(429, str(e), headers={"Retry-After": str(admission.retry_after)})
+    return {"ok": True, "job_id": job.id, "status": job.status}
+
+@app.get("/api/jobs/{job_id}")
+def get_job(job_id: str):
+    job = jobs.store.get(job_id)
+    if job is None:
+        raise HTTPException(404, "Job not found (unknown or expired)")
+    return {"ok": job.status != "error", **job.to_dict()}
+
+# ===== Bill library (dockets pre-generated off-peak) =====
+library = build_library()
+LIBRARY_MAX_DOCKET = int(os.getenv("LIBRARY_MAX_DOCKET", "200"))
+LIBRARY_WARMUP_MAX_INFLIGHT = int(os.getenv("LIBRARY_WARMUP_MAX_INFLIGHT", "4"))
+
+def _library_options(body: GenerateBody) -> dict:
+    return body.model_dump(include=set(OPTION_FIELDS))
+
+def _library_hit(body: GenerateBody) -> Optional[dict]:
+    # Same cache_mode semantics as the LLM cache: refresh and bypass never read
+    if library is None or body.cache_mode != "default":
+        return None
+    result, fp, score = library.lookup(body.bill, _library_options(body))
+    if result is None:
+        return None
+    return {**result, "library": {"fingerprint": fp[:16], "similarity": round(score, 3)}}
+
+def _library_store(body: GenerateBody, result: dict):
+    # Any full (not degraded) result for a docket bill is kept, whether pre-generated or on demand
+    if library is None or body.cache_mode == "bypass":
+        return
+    fp = fingerprint(body.bill)
+    if library.has(fp):
+        kept = ("result", "speeches", "variants", "duplicates_dropped")
+        library.put(fp, _library_options(body), {"ok": True, **{k: result[k] for k in kept if k in result}})
+
+def _library_idle() -> bool:
+    return admission.level() == NORMAL and admission.inflight() < LIBRARY_WARMUP_MAX_INFLIGHT
+
+async def _warm_library(bill: str, options: dict) -> Optional[dict]:
+    # "refresh": skip the library/cache reads, still store the result
+    body = GenerateBody(bill=bill, **options, cache_mode="refresh")
+    result = await _generate_result(body, get_llm_client())
+    if result.get("errors"):
+        raise RuntimeError("; ".join(result["errors"].values()))
+    return None if result.get("degraded") else result
+
+warmup = None
+if library:
+    combos = [_library_options(GenerateBody(bill="-", **c)) for c in warmup_combos()]
+    warmup = build_warmup(library, _warm_library, combos, _library_idle)
+
+def _require_library():
+    if library is None:
+        raise HTTPException(400, "Bill library is disabled (set LIBRARY_DB)")
+    return library
+
+@app.post("/api/library/dockets")
+def ingest_docket(body: DocketBody):
+    lib = _require_library()
+    bills = [b for b in body.bills if b.strip()]
+    if len(bills) > LIBRARY_MAX_DOCKET:
+        raise HTTPException(400, f"Too many bills (max {LIBRARY_MAX_DOCKET})")
+    added = [lib.add_bill(bill, body.docket) for bill in bills]
+    return {
+        "ok": True,
+        "bills": [fp for fp, _ in added],
+        "added": sum(new for _, new in added),
+        "pending": sum(1 for _ in lib.missing(warmup.combos)),
+    }
+
+@app.get("/api/library/stats")
+def library_stats():
+    if library is None:
+        return {"ok": True, "enabled": False}
+    return {"ok": True, "enabled": True, **library.stats(), "warmup": warmup.stats()}
+
+# ===== Batch (whole docket) =====
+# NDJSON, one line per bill in completion order: {index, ok, status, result, speeches} or {index, ok, status, detail}
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "16"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "50"))
+
+async def _batch_item(index: int, body: GenerateBody, client, sem: asyncio.Semaphore) -> dict:
+    queued = time.perf_counter()
+    async with sem:
+        # Self-imposed batch slots: recorded, but not fed to admission pressure
+        QUEUE_WAIT.observe("batch", value=time.perf_counter() - queued)
         try:
-            speeches_text = client.generate(sp_prompt)
-            if body.polish:
-                sp_pol_prompt = build_polish_prompt(speeches_text, style=body.style, custom_instructions=body.custom_instructions)
-                speeches_text = client.generate(sp_pol_prompt)
+            return {"index": index, "status": 200, **await _generate_result(body, client)}
+        except HTTPException as e:
+            return {"index": index, "ok": False, "status": e.status_code, "detail": e.detail}
         except Exception as e:
-            raise HTTPException(500, f"LLM error (speeches): {e}")
+            return {"index": index, "ok": False, "status": 500, "detail": f"LLM error: {e}"}
+
+async def _batch_lines(items: list, concurrency: int, client):
+    sem = asyncio.Semaphore(concurrency)
+    tasks = [asyncio.create_task(_batch_item(i, item, client, sem)) for i, item in enumerate(items)]
+    try:
+        for done in asyncio.as_completed(tasks):
+            yield json.dumps(await done) + "\n"
+    finally:
+        # Client went away: stop spending on the rest of the docket
+        for t in tasks:
+            t.cancel()
+
+@app.post("/api/generate/batch")
+async def generate_batch(body: BatchBody):
+    if not body.items:
+        raise HTTPException(400, "At least one item required")
+    if len(body.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(400, f"At most {BATCH_MAX_ITEMS} items per batch")
+    try:
+        admission.check()  # items are then admitted (and degraded) one by one
+    except Overloaded as e:
+        raise _overloaded(e)
+    concurrency = max(1, min(body.concurrency or BATCH_CONCURRENCY, BATCH_MAX_CONCURRENCY))
+    return StreamingResponse(
+        _batch_lines(body.items, concurrency, get_llm_client()), media_type="application/x-ndjson"
+    )
+
+# ===== Streaming (Server-Sent Events) =====
+# Events: [degraded {shed}] stage {stage} -> token {stage, text}* -> stage_done {stage, text}, error {stage, detail}, done {...}
+# With variants > 1 the package stage also sends variants {variants, duplicates_dropped} before its single token
+# Stages: package, package_polish, speeches, speeches_polish, chat
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _stream_stage(client, prompt, stage: str, queue: asyncio.Queue):
+    await queue.put(_sse("stage", {"stage": stage}))
+    parts = []
+    with span(stage):
+        async for piece in client.astream(prompt):
+            parts.append(piece)
+            await queue.put(_sse("token", {"stage": stage, "text": piece}))
+    text = "".join(parts)
+    await queue.put(_sse("stage_done", {"stage": stage, "text": text}))
+    return text
+
+async def _stream_chain(client, prompt, chain: str, body: GenerateBody, queue: asyncio.Queue, stages: dict):
+    stage = chain
+    try:
+        if chain == "package" and body.variants > 1:
+            # Variants are ranked before anything is shown, so the best draft arrives in one chunk
+            await queue.put(_sse("stage", {"stage": stage}))
+            text = await _run_variants(client, prompt, body, stages)
+            await queue.put(_sse("variants", stages["package_variants"]))
+            await queue.put(_sse("token", {"stage": stage, "text": text}))
+            await queue.put(_sse("stage_done", {"stage": stage, "text": text}))
+        else:
+            text = await _stream_stage(client, prompt, stage, queue)
+        if body.polish:
+            stage = f"{chain}_polish"
+            if body.polish_mode == "always":
+                POLISH.inc(stage, "full")
+                text = await _stream_stage(client, _polish_prompt(text, body), stage, queue)
+            else:
+                polished = await _review_polish(client, text, chain, body)
+                if polished is not None:
+                    # Section polish is not streamed; the stage arrives as one replacement chunk
+                    await queue.put(_sse("stage", {"stage": stage}))
+                    await queue.put(_sse("token", {"stage": stage, "text": polished}))
+                    await queue.put(_sse("stage_done", {"stage": stage, "text": polished}))
+                    text = polished
+        return text
+    except Exception as e:
+        await queue.put(_sse("error", {"stage": stage, "detail": f"LLM error ({stage}): {e}"}))
+        raise
 
-    return {"ok": True, "result": pkg_text, "speeches": speeches_text}
+async def _merge_streams(run, queue: asyncio.Queue):
+    # Drain the shared queue while the chains run concurrently
+    task = asyncio.create_task(run)
+    try:
+        while not (task.done() and queue.empty()):
+            getter = asyncio.create_task(queue.get())
+            await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+            if getter.done():
+                yield getter.result()
+            else:
+                getter.cancel()
+        yield await task
+    finally:
+        task.cancel()
+
+@app.post("/api/generate/stream")
+async def generate_stream(body: GenerateBody):
+    _require_bill(body)
+    session = _context_session(body.session_id)
+    client = get_llm_client()
+    hit = _library_hit(body)
+    if hit:
+        if session:
+            await _remember_package(session, client, body.bill, hit["result"])
+        # Everything the library stored (variants included), as _generate_result returns it
+        done = _sse("done", {**hit, "degraded": [], **_session_ref(body, session)})
+        return StreamingResponse(iter([done]), media_type="text/event-stream", headers=SSE_HEADERS)
+    body, degraded = _admit(body)
+    queue = asyncio.Queue()
+    if degraded:
+        queue.put_nowait(_sse("degraded", {"shed": degraded}))
+
+    async def run():
+        stages = {}
+        with admission.track(generate_calls(body.polish, body.return_full_speeches, body.variants)), cache_mode(body.cache_mode):
+            try:
+                prompts = await _chain_prompts(body, client)
+            except HTTPException as e:
+                await queue.put(_sse("error", {"stage": "digest", "detail": e.detail}))
+                return _sse("done", {"ok": False, "result": None, "speeches": None, "degraded": degraded})
+            chains = {name: _stream_chain(client, prompt, name, body, queue, stages) for name, prompt in prompts.items()}
+            results = dict(zip(chains, await asyncio.gather(*chains.values(), return_exceptions=True)))
+        ok = not any(isinstance(r, Exception) for r in results.values())
+        final = {name: None if isinstance(r, Exception) else r for name, r in results.items()}
+        if session and final["package"] is not None:
+            await _remember_package(session, client, body.bill, final["package"])
+        result = {"result": final["package"], "speeches": final.get("speeches"), **stages.get("package_variants", {})}
+        if ok and not degraded:
+            _library_store(body, result)
+        return _sse("done", {"ok": ok, **result, "degraded": degraded, **_session_ref(body, session)})
+
+    return StreamingResponse(_merge_streams(run(), queue), media_type="text/event-stream", headers=SSE_HEADERS)
+
+# ===== Chat sessions =====
+sessions = build_session_store()
+
+def _session(session_id: str) -> Session:
+    session = sessions.get(session_id)
+    if session is None:
+        raise HTTPException(404, "Session not found (unknown or expired)")
+    return session
+
+def _context_session(session_id: Optional[str]) -> Optional[Session]:
+    # Generate only adds context to a session, so an unknown or expired id is ignored rather than a 404
+    session = sessions.get(session_id) if session_id else None
+    if session_id and session is None:
+        log_event("session_ignored", session_id=session_id)
+    return session
+
+def _session_ref(body: GenerateBody, session: Optional[Session]) -> dict:
+    # session_id: null tells the client its session is gone
+    return {"session_id": session.id if session else None} if body.session_id else {}
+
+async def _session_bill(session: Session, client, bill: Optional[str]):
+    # Each bill is sent (and digested) once per session; later turns only carry the message
+    if bill and not session.same_bill(bill):
+        session.set_bill(bill, await _prepare_bill(client, bill))
+
+async def _remember_package(session: Session, client, bill: str, package: str):
+    await _session_bill(session, client, bill)
+    session.package = package
+
+def _session_turn(session: Optional[Session]):
+    return session.lock if session else nullcontext()
 
+async def _chat_prompt(body: ChatBody, client, session: Optional[Session]) -> list:
+    if session is None:
+        bill = await _prepare_bill(client, body.bill) if body.bill else None
+        return build_chat_prompt(body.message, bill, style=body.style, novelty=body.novelty)
+    await _session_bill(session, client, body.bill)
+    return build_chat_prompt(
+        body.message, session.bill, style=body.style, novelty=body.novelty, package=session.package,
+        summary=session.summary, history=session.recent(sessions.history_tokens),
+    )
+
+@app.post("/api/chat/sessions")
+async def create_session(body: SessionBody):
+    session = sessions.create()
+    if body.bill:
+        _admit_call()
+        with admission.track(1):
+            await _session_bill(session, get_llm_client(), body.bill)
+    return {"ok": True, **session.to_dict()}
+
+@app.get("/api/chat/sessions/{session_id}")
+def get_session(session_id: str):
+    return {"ok": True, **_session(session_id).to_dict()}
+
+# ===== Chat =====
 @app.post("/api/chat")
-def chat(body: ChatBody):
+async def chat(body: ChatBody):
+    session = _session(body.session_id) if body.session_id else None
+    _admit_call()
     client = get_llm_client()
-    prompt = build_chat_prompt(body.message, body.bill, style=body.style, novelty=body.novelty)
     try:
-        reply = client.generate(prompt)
+        with admission.track(1), cache_mode(body.cache_mode):
+            async with _session_turn(session):
+                prompt = await _chat_prompt(body, client, session)
+                with span("chat"):
+                    reply = await client.agenerate(prompt)
+                if session:
+                    session.add_turn(body.message, reply)
+        if session:
+            sessions.schedule_compaction(client, session)
+            return {"ok": True, "result": reply, "session_id": session.id}
         return {"ok": True, "result": reply}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(500, f"LLM error (chat): {e}")
 
-@app.post("/api/po-assist")
-def po_assist(body: POBody):
+@app.post("/api/chat/stream")
+async def chat_stream(body: ChatBody):
+    session = _session(body.session_id) if body.session_id else None
+    _admit_call()
     client = get_llm_client()
-    prompt = build_po_prompt(body.text)
+    queue = asyncio.Queue()
+
+    async def run():
+        try:
+            with admission.track(1), cache_mode(body.cache_mode):
+                async with _session_turn(session):
+                    prompt = await _chat_prompt(body, client, session)
+                    reply = await _stream_stage(client, prompt, "chat", queue)
+                    if session:
+                        session.add_turn(body.message, reply)
+            if session:
+                sessions.schedule_compaction(client, session)
+                return _sse("done", {"ok": True, "result": reply, "session_id": session.id})
+            return _sse("done", {"ok": True, "result": reply})
+        except Exception as e:
+            await queue.put(_sse("error", {"stage": "chat", "detail": f"LLM error (chat): {e}"}))
+            return _sse("done", {"ok": False, "result": None})
+
+    return StreamingResponse(_merge_streams(run(), queue), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@app.post("/api/po-assist")
+async def po_assist(body: POBody):
+    # Common chamber phrasing is parsed locally; only lines the rules miss cost an LLM call
+    with span("po_rules"):
+        result = parse_po(body.text)
+    if not result.unparsed or not body.llm_fallback:
+        return {"ok": True, "result": result.model_dump()}
+    # The rules result is ready either way: under load or on an LLM error it is returned as is
+    if admission.level() > NORMAL:
+        ADMISSION.inc("degrade")
+        result.llm_error = "fallback skipped: server under load"
+        return {"ok": True, "result": result.model_dump()}
+    ADMISSION.inc("admit")
+    prompt = build_po_prompt(fallback_text(result))
     try:
-        result = client.generate(prompt)
-        return {"ok": True, "result": result}
+        with admission.track(1), span("po"):
+            raw = await get_llm_client().agenerate(prompt)
     except Exception as e:
-        raise HTTPException(500, f"LLM error (po): {e}")
+        result.llm_error = f"LLM error (po): {e}"
+        return {"ok": True, "result": result.model_dump()}
+    return {"ok": True, "result": merge_llm(result, raw).model_dump()}
@@ -0,0 +1,208 @@
+# backend/metrics.py
+import os
+import sys
+import json
+import time
+import uuid
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# ===== Request context (set by the middleware in main.py) =====
+request_id: ContextVar[str] = ContextVar("request_id", default="-")
+endpoint: ContextVar[str] = ContextVar("endpoint", default="-")
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+# ===== Structured JSON logs (LOG_JSON=1) =====
+log = logging.getLogger("debate")
+LOG_JSON = os.getenv("LOG_JSON", "0") == "1"
+
+class _JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {"ts": round(record.created, 3), "level": record.levelname.lower(), "msg": record.getMessage()}
+        entry.update(getattr(record, "fields", {}))
+        return json.dumps(entry)
+
+def setup_logging():
+    if not LOG_JSON or log.handlers:
+        return
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(_JSONFormatter())
+    log.addHandler(handler)
+    log.setLevel(logging.INFO)
+    log.propagate = False
+
+def log_event(msg: str, **fields):
+    if LOG_JSON:
+        log.info(msg, extra={"fields": {"request_id": request_id.get(), "endpoint": endpoint.get(), **fields}})
+
+# ===== Prometheus primitives (text exposition format 0.0.4) =====
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{str(v)}"'.replace("\n", " ") for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def _header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> list[str]:
+        lines = self._header()
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.label_names, key)} {value}")
+        return lines
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, *labels, value: float):
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0.0)
+
+class Histogram(_Metric):
+    kind = "histogram"
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 180)
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = buckets
+        self._series: dict[tuple, list] = {}  # labels -> [bucket counts..., sum, count]
+
+    def observe(self, *labels, value: float):
+        with self._lock:
+            series = self._series.setdefault(labels, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = self._header()
+        names = self.label_names + ("le",)
+        for key, series in sorted(self._series.items()):
+            for bound, count in zip(self.buckets, series):
+                lines.append(f"{self.name}_bucket{_labels(names, key + (bound,))} {count}")
+            lines.append(f"{self.name}_bucket{_labels(names, key + ('+Inf',))} {series[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {round(series[-2], 6)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {series[-1]}")
+        return lines
+
+class DecayingAverage:
+    # EWMA that also decays toward 0 while idle, so a past spike does not linger
+    def __init__(self, alpha: float = 0.2, half_life: float = 10.0):
+        self.alpha = alpha
+        self.half_life = half_life
+        self._value = 0.0
+        self._updated = time.monotonic()
+
+    def _decayed(self, now: float) -> float:
+        return self._value * 0.5 ** ((now - self._updated) / self.half_life)
+
+    def observe(self, sample: float):
+        now = time.monotonic()
+        self._value = (1 - self.alpha) * self._decayed(now) + self.alpha * sample
+        self._updated = now
+
+    def value(self) -> float:
+        return self._decayed(time.monotonic())
+
+# ===== Service metrics =====
+REQUESTS = Counter("debate_requests_total", "HTTP requests by endpoint and status.", ("endpoint", "status"))
+REQUEST_SECONDS = Histogram("debate_request_seconds", "HTTP request latency (until headers for streams).", ("endpoint",))
+STAGE_SECONDS = Histogram("debate_stage_seconds", "Latency of pipeline stages.", ("endpoint", "stage", "outcome"))
+LLM_CALLS = Counter("debate_llm_calls_total", "Upstream LLM calls.", ("provider", "model", "outcome"))
+LLM_SECONDS = Histogram("debate_llm_call_seconds", "Upstream LLM call latency.", ("provider", "model"))
+LLM_INFLIGHT = Gauge("debate_llm_inflight", "Upstream LLM calls currently in flight.")
+LLM_TOKENS = Counter("debate_llm_tokens_total", "Tokens reported by provider usage fields.", ("provider", "model", "kind"))
+QUEUE_WAIT = Histogram("debate_queue_wait_seconds", "Time spent waiting for a slot before work starts.", ("queue",))
+ADMISSION = Counter("debate_admission_total", "Admission decisions.", ("decision",))
+ADMISSION_COMMITTED = Gauge("debate_admission_committed_calls", "LLM calls expected from admitted, unfinished requests.")
+POLISH = Counter("debate_polish_total", "Polish decisions per chain after the local review.", ("stage", "decision"))
+RECENT_QUEUE_WAIT = DecayingAverage()
+
+REGISTRY = [
+    REQUESTS, REQUEST_SECONDS, STAGE_SECONDS, LLM_CALLS, LLM_SECONDS, LLM_INFLIGHT, LLM_TOKENS, QUEUE_WAIT,
+    ADMISSION, ADMISSION_COMMITTED, POLISH,
+]
+
+def observe_queue_wait(queue: str, seconds: float):
+    QUEUE_WAIT.observe(queue, value=seconds)
+    RECENT_QUEUE_WAIT.observe(seconds)
+
+def record_usage(provider: str, model: str, prompt_tokens: int | None, completion_tokens: int | None):
+    if prompt_tokens:
+        LLM_TOKENS.inc(provider, model, "prompt", amount=prompt_tokens)
+    if completion_tokens:
+        LLM_TOKENS.inc(provider, model, "completion", amount=completion_tokens)
+    log_event("llm_usage", provider=provider, model=model,
+              prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+@contextmanager
+def span(stage: str):
+    # Times one pipeline stage under the current endpoint; failures are labelled outcome="error"
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        STAGE_SECONDS.observe(endpoint.get(), stage, outcome, value=seconds)
+        log_event("span", stage=stage, outcome=outcome, seconds=round(seconds, 4))
+
+def _flatten(prefix: str, stats: dict, labels: tuple = (), label_names: tuple = ()) -> list[str]:
+    # Client layer stats ({"cache": {...}, "router": {...}}) as untyped samples; a dict of dicts is per backend
+    lines = []
+    for key, value in stats.items():
+        if isinstance(value, dict):
+            if value and all(isinstance(v, dict) for v in value.values()):
+                for backend, sub in value.items():
+                    name = prefix if key == "backends" else f"{prefix}_{key}"
+                    lines += _flatten(name, sub, labels + (backend,), label_names + ("backend",))
+            else:
+                lines += _flatten(f"{prefix}_{key}", value, labels, label_names)
+        elif isinstance(value, (bool, int, float)):
+            lines.append(f"{prefix}_{key}{_labels(label_names, labels)} {int(value) if isinstance(value, bool) else value}")
+    return lines
+
+def render(client_stats: dict | None = None) -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines += metric.render()
+    if client_stats:
+        # Sorting keeps each sample family contiguous
+        lines += sorted(_flatten("debate_llm", client_stats))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,117 @@
+# backend/mock_llm.py
+import os
+import math
+import time
+import random
+import asyncio
+import hashlib
+
+from llm import LLMClient
+from metrics import record_usage
+from tokens import estimate_message_tokens
+
+# Offline stand-in for a provider (LLM_PROVIDER=mock): seeded latency, streaming cadence,
+# token counts and error injection, so the orchestration layer can be measured for free.
+
+class MockLLMError(RuntimeError):
+    pass
+
+def parse_distribution(spec: str):
+    # "fixed:0.8" | "uniform:0.2,1.5" | "normal:1.0,0.2" | "lognormal:1.0,0.5" (median seconds, sigma)
+    kind, _, args = (spec or "fixed:0").partition(":")
+    params = [float(a) for a in args.split(",") if a.strip()] or [0.0]
+    kind = kind.strip().lower()
+    if kind == "fixed":
+        return lambda rng: params[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(params[0], params[1])
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(params[0], params[1]))
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(math.log(max(params[0], 1e-6)), params[1])
+    raise ValueError(f"Unknown latency distribution: {spec!r}")
+
+_WORDS = (
+    "First the mechanism shifts procurement timelines; Second the impact compounds across states; "
+    "Third what this means is a durable coverage gap. Weighing: probability timeframe irreversibility."
+).split()
+
+class MockLLMClient(LLMClient):
+    provider = "mock"
+
+    def __init__(self, model=None, latency: str = "fixed:0.5", ttft: str = "fixed:0.2",
+                 chunk_delay: float = 0.01, completion_tokens: int = 400, chunk_tokens: int = 8,
+                 error_rate: float = 0.0, seed: int = 42):
+        self.model = model or "mock"
+        self.latency = parse_distribution(latency)
+        self.ttft = parse_distribution(ttft)
+        self.chunk_delay = chunk_delay
+        self.completion_tokens = completion_tokens
+        self.chunk_tokens = max(1, chunk_tokens)
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.errors = 0
+
+    def _text(self, messages, choice: int = 0) -> str:
+        # Deterministic per prompt (and choice), so caching and coalescing behave as with a real provider
+        digest = hashlib.sha256((repr(messages) + (f"#{choice}" if choice else "")).encode("utf-8")).hexdigest()
+        offset = int(digest[:8], 16)
+        words = [_WORDS[(offset + i) % len(_WORDS)] for i in range(self.completion_tokens)]
+        return f"[mock {digest[:12]}] " + " ".join(words)
+
+    def _maybe_fail(self):
+        self.calls += 1
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.errors += 1
+            raise MockLLMError("mock provider error (injected)")
+
+    def _usage(self, messages):
+        record_usage(self.provider, self.model, estimate_message_tokens(messages), self.completion_tokens)
+
+    def generate(self, messages):
+        time.sleep(self.latency(self.rng))
+        self._maybe_fail()
+        self._usage(messages)
+        return self._text(messages)
+
+    async def agenerate(self, messages):
+        await asyncio.sleep(self.latency(self.rng))
+        self._maybe_fail()
+        self._usage(messages)
+        return self._text(messages)
+
+    async def agenerate_n(self, messages, n: int) -> list[str]:
+        # Like OpenAI's `n`: one call, one latency, n distinct choices
+        await asyncio.sleep(self.latency(self.rng))
+        self._maybe_fail()
+        record_usage(self.provider, self.model, estimate_message_tokens(messages), n * self.completion_tokens)
+        return [self._text(messages, i) for i in range(n)]
+
+    async def astream(self, messages):
+        await asyncio.sleep(self.ttft(self.rng))
+        self._maybe_fail()
+        words = self._text(messages).split(" ")
+        for i in range(0, len(words), self.chunk_tokens):
+            if i:
+                await asyncio.sleep(self.chunk_delay)
+            yield " ".join(words[i:i + self.chunk_tokens]) + " "
+        self._usage(messages)
+
+    def fingerprint(self) -> dict:
+        return {**super().fingerprint(), "completion_tokens": self.completion_tokens}
+
+    def stats(self) -> dict:
+        return {"mock": {"calls": self.calls, "errors": self.errors}}
+
+def mock_from_env(model=None) -> MockLLMClient:
+    return MockLLMClient(
+        model=model,
+        latency=os.getenv("MOCK_LATENCY", "lognormal:0.8,0.4"),
+        ttft=os.getenv("MOCK_TTFT", "lognormal:0.3,0.3"),
+        chunk_delay=float(os.getenv("MOCK_CHUNK_DELAY", "0.01")),
+        completion_tokens=int(os.getenv("MOCK_COMPLETION_TOKENS", "400")),
+        chunk_tokens=int(os.getenv("MOCK_CHUNK_TOKENS", "8")),
+        error_rate=float(os.getenv("MOCK_ERROR_RATE", "0")),
+        seed=int(os.getenv("MOCK_SEED", "42")),
+    )
@@ -0,0 +1,284 @@
+# backend/po.py
+import re
+import json
+from typing import Literal, Optional
+
+from pydantic import BaseModel, ValidationError
+
+# Presiding Officer assist: common chamber phrasing is parsed here with regexes (no LLM round trip);
+# only the lines the rules miss are sent to the model, and its JSON is repaired and validated.
+
+# ===== Schema =====
+Side = Literal["affirmative", "negative", "authorship", "sponsorship"]
+MotionKind = Literal[
+    "previous_question", "table", "adjourn", "recess", "extend_questioning", "suspend_rules", "amend", "other",
+]
+
+# line: index of the source line in the transcript (None when the model did not say)
+class Recognition(BaseModel):
+    speaker: str
+    kind: Literal["speech", "question"] = "speech"
+    side: Optional[Side] = None
+    line: Optional[int] = None
+
+class QuestionBlock(BaseModel):
+    action: Literal["open", "close"]
+    seconds: Optional[int] = None
+    line: Optional[int] = None
+
+class TimeNotice(BaseModel):
+    speaker: Optional[str] = None
+    seconds_remaining: Optional[int] = None  # 0 = time has expired
+    grace: bool = False
+    line: Optional[int] = None
+
+class Motion(BaseModel):
+    kind: MotionKind
+    mover: Optional[str] = None
+    seconded: bool = False
+    outcome: Optional[Literal["passed", "failed"]] = None
+    line: Optional[int] = None
+
+class PrecedenceEntry(BaseModel):
+    speaker: str
+    speeches: int
+    last_recognized: int  # position among speech recognitions; lower = longer ago
+
+class POActions(BaseModel):
+    recognitions: list[Recognition] = []
+    question_blocks: list[QuestionBlock] = []
+    time_notices: list[TimeNotice] = []
+    motions: list[Motion] = []
+
+class POResult(POActions):
+    precedence: list[PrecedenceEntry] = []  # next speaker first: fewest speeches, then least recent
+    unparsed: list[str] = []  # lines the rules missed (handed to the LLM when source is "rules+llm")
+    unparsed_lines: list[int] = []  # their line indices
+    source: Literal["rules", "rules+llm"] = "rules"
+    llm_error: Optional[str] = None
+
+# ===== Rule-based parser =====
+_SPLIT_RE = re.compile(r"\n+|(?<=[!?])\s+|(?<=\.)(?<!Sen\.)(?<!Rep\.)(?<!Mr\.)(?<!Ms\.)(?<!Mrs\.)(?<!Dr\.)\s+")
+_NAME_RE = re.compile(
+    r"\b(?:Senator|Sen\.|Representative|Rep\.|Delegate|Mr\.|Ms\.|Mrs\.)\s+([A-Z][\w'-]*(?:\s+[A-Z][\w'-]*)?)"
+)
+_NAME_STOP = {"For", "To", "The", "You", "Has", "Is", "In", "On", "With", "Please", "Moves", "Time"}
+# Stripped before parsing; a line that is only courtesy ("Thank you, Senator.") is dropped
+_COURTESY_RE = re.compile(
+    r"^(?:thank you|thanks|please be seated|good (?:morning|afternoon|evening)|welcome)\b[\s,.!;:]*", re.I
+)
+
+_NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "ten": 10, "fifteen": 15,
+    "twenty": 20, "thirty": 30, "forty five": 45, "sixty": 60,
+}
+_DURATION_RE = re.compile(
+    r"\b(\d+|an?|one|two|three|four|five|ten|fifteen|twenty|thirty|forty[- ]five|sixty)[- ]?"
+    r"(seconds?|secs?|minutes?|mins?)\b", re.I,
+)
+
+_RECOGNIZE_RE = re.compile(r"\brecogni[sz]\w*\b|\b(?:you (?:now )?have|yours is) the floor\b|\bthe floor is yours\b", re.I)
+_SIDE_RE = re.compile(r"\b(affirmative|aff|in favou?r|negative|neg|in opposition|against|authorship|sponsorship)\b", re.I)
+_SIDES = {"aff": "affirmative", "in favor": "affirmative", "in favour": "affirmative",
+          "neg": "negative", "in opposition": "negative", "against": "negative"}
+_QUESTIONER_RE = re.compile(r"\bfor (?:a |the )?question\b|\bto (?:ask a )?question\b|\bquestioner\b", re.I)
+
+_QX = r"(?:question(?:s|ing)?|cross[- ]?ex\w*|qx)"
+_BLOCK_OPEN_RE = re.compile(rf"\b(?:open\w*|begin\w*|start\w*)\b.*?\b{_QX}\b|\b{_QX}\b.*?\bis (?:now )?open\b"
+                            rf"|\bof {_QX}\b", re.I)
+_BLOCK_CLOSE_RE = re.compile(rf"\b(?:clos\w*|end\w*|conclud\w*)\b.*?\b{_QX}\b|\b{_QX}\b.*?\bis (?:now )?(?:closed|over)\b", re.I)
+
+_REMAINING_RE = re.compile(r"\b(?:remaining|left)\b", re.I)
+_EXPIRED_RE = re.compile(r"\btime (?:has )?(?:expired|elapsed|is up)\b|\bout of time\b", re.I)
+_GRACE_RE = re.compile(r"\bgrace\b", re.I)
+
+_MOVE_RE = re.compile(r"\b(?:move[sd]?|motion)\b", re.I)
+_MOTIONS: list[tuple[str, re.Pattern]] = [
+    ("previous_question", re.compile(r"\bprevious question\b|\bcall(?:ing)? the question\b|\bto (?:a )?vote\b", re.I)),
+    ("table", re.compile(r"\btabl(?:e|ing)\b", re.I)),
+    ("adjourn", re.compile(r"\badjourn", re.I)),
+    ("recess", re.compile(r"\brecess\b", re.I)),
+    ("extend_questioning", re.compile(rf"\bextend\w*\b.*?\b{_QX}\b", re.I)),
+    ("suspend_rules", re.compile(r"\bsuspend\w* the rules\b", re.I)),
+    ("amend", re.compile(r"\bamend", re.I)),
+]
+_SECONDED_RE = re.compile(r"\bseconded\b|\bsecond(?:s)? the motion\b|\bI second\b", re.I)
+_SECOND_CALL_RE = re.compile(r"\bis there a second\b|\bdo I hear a second\b", re.I)  # the chair asking: not seconded
+_PASSED_RE = re.compile(r"\b(?:passes|passed|carries|carried|adopted|approved)\b", re.I)
+_FAILED_RE = re.compile(r"\b(?:fails|failed|defeated|rejected)\b", re.I)
+
+def split_lines(text: str) -> list[str]:
+    return [line.strip() for line in _SPLIT_RE.split(text or "") if line and line.strip()]
+
+def _name(line: str) -> Optional[str]:
+    m = _NAME_RE.search(line)
+    if not m:
+        return None
+    words = m.group(1).split()
+    if len(words) > 1 and words[1] in _NAME_STOP:
+        words = words[:1]
+    return " ".join(words)
+
+def _seconds(line: str) -> Optional[int]:
+    m = _DURATION_RE.search(line)
+    if not m:
+        return None
+    amount, unit = m.group(1).lower(), m.group(2).lower()
+    value = int(amount) if amount.isdigit() else _NUMBER_WORDS[amount.replace("-", " ")]
+    return value * 60 if unit.startswith("min") else value
+
+def _outcome(line: str) -> Optional[str]:
+    if _PASSED_RE.search(line):
+        return "passed"
+    if _FAILED_RE.search(line):
+        return "failed"
+    return None
+
+def _parse_line(line: str, out: POActions, index: int) -> bool:
+    # Appends whatever the line expresses to `out`; False when no rule matched
+    matched = False
+    name = _name(line)
+
+    if _MOVE_RE.search(line) or _SECONDED_RE.search(line) or _SECOND_CALL_RE.search(line):
+        kind = next((k for k, rx in _MOTIONS if rx.search(line)), None)
+        if kind:
+            out.motions.append(Motion(kind=kind, mover=name, seconded=bool(_SECONDED_RE.search(line)),
+                                      outcome=_outcome(line), line=index))
+            return True
+        if out.motions:
+            # "Is there a second?" / "The motion carries." refer to the motion on the floor
+            if _SECONDED_RE.search(line):
+                out.motions[-1].seconded = True
+                matched = True
+            if _SECOND_CALL_RE.search(line):
+                matched = True
+            if _outcome(line):
+                out.motions[-1].outcome = _outcome(line)
+                matched = True
+            if matched:
+                return True
+
+    if _BLOCK_CLOSE_RE.search(line):
+        out.question_blocks.append(QuestionBlock(action="close", line=index))
+        matched = True
+    elif _BLOCK_OPEN_RE.search(line):
+        out.question_blocks.append(QuestionBlock(action="open", seconds=_seconds(line), line=index))
+        matched = True
+
+    if name and _RECOGNIZE_RE.search(line):
+        side = _SIDE_RE.search(line)
+        side = side.group(1).lower() if side else None
+        kind = "question" if _QUESTIONER_RE.search(line) else "speech"
+        out.recognitions.append(Recognition(speaker=name, kind=kind, side=_SIDES.get(side, side), line=index))
+        matched = True
+
+    if _EXPIRED_RE.search(line):
+        out.time_notices.append(TimeNotice(speaker=name, seconds_remaining=0, grace=bool(_GRACE_RE.search(line)),
+                                           line=index))
+        matched = True
+    elif _REMAINING_RE.search(line) and _seconds(line) is not None:
+        out.time_notices.append(TimeNotice(speaker=name, seconds_remaining=_seconds(line), line=index))
+        matched = True
+    elif _GRACE_RE.search(line):
+        out.time_notices.append(TimeNotice(speaker=name, grace=True, line=index))
+        matched = True
+
+    return matched
+
+def precedence(recognitions: list[Recognition]) -> list[PrecedenceEntry]:
+    # Standard chamber order: fewest speeches first, ties broken by who spoke longest ago
+    entries: dict[str, PrecedenceEntry] = {}
+    speeches = [r for r in recognitions if r.kind == "speech"]
+    for i, r in enumerate(speeches):
+        entry = entries.setdefault(r.speaker, PrecedenceEntry(speaker=r.speaker, speeches=0, last_recognized=i))
+        entry.speeches += 1
+        entry.last_recognized = i
+    return sorted(entries.values(), key=lambda e: (e.speeches, e.last_recognized))
+
+def _line_key(item) -> float:
+    return item.line if item.line is not None else float("inf")
+
+def _ordered(actions: POActions) -> POActions:
+    # Transcript order (items without a line last); back-to-back recognitions of the same speaker
+    # ("The chair recognizes Senator Smith. Senator Smith, the floor is yours.") are one recognition
+    out = POActions(**{key: sorted(getattr(actions, key), key=_line_key) for key in _ITEM_MODELS})
+    others = [_line_key(i) for key in ("question_blocks", "time_notices", "motions") for i in getattr(out, key)]
+    kept: list[Recognition] = []
+    for r in out.recognitions:
+        prev = kept[-1] if kept else None
+        if (prev and prev.speaker == r.speaker and prev.kind == r.kind
+                and not any(_line_key(prev) < x < _line_key(r) for x in others)):
+            kept[-1] = prev.model_copy(update={"side": prev.side or r.side})
+            continue
+        kept.append(r)
+    out.recognitions = kept
+    return out
+
+def _result(actions: POActions, **fields) -> POResult:
+    actions = _ordered(actions)
+    return POResult(**actions.model_dump(), precedence=precedence(actions.recognitions), **fields)
+
+def parse_po(text: str) -> POResult:
+    out = POActions()
+    unparsed, unparsed_lines = [], []
+    for i, line in enumerate(split_lines(text)):
+        courtesy = _COURTESY_RE.match(line)
+        rest = line[courtesy.end():] if courtesy else line
+        if rest and _parse_line(rest, out, i):
+            continue
+        if not courtesy:
+            unparsed.append(line)
+            unparsed_lines.append(i)
+    return _result(out, unparsed=unparsed, unparsed_lines=unparsed_lines)
+
+def fallback_text(result: POResult) -> str:
+    # Unparsed lines tagged with their index, so the model's items can be merged back in transcript order
+    return "\n".join(f"[{i}] {line}" for i, line in zip(result.unparsed_lines, result.unparsed))
+
+# ===== LLM fallback: repair + validate =====
+_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$", re.I)
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+
+def repair_json(raw: str) -> dict:
+    # Models wrap JSON in fences, add prose around it, or leave trailing commas
+    text = _FENCE_RE.sub("", (raw or "").strip())
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end <= start:
+        raise ValueError("no JSON object in model output")
+    text = _TRAILING_COMMA_RE.sub(r"\1", text[start:end + 1])
+    data = json.loads(text)
+    if not isinstance(data, dict):
+        raise ValueError("model output is not a JSON object")
+    return data
+
+_ITEM_MODELS = {
+    "recognitions": Recognition,
+    "question_blocks": QuestionBlock,
+    "time_notices": TimeNotice,
+    "motions": Motion,
+}
+
+def validate_actions(data: dict) -> POActions:
+    # Item by item, so one malformed entry does not throw away the rest
+    actions = POActions()
+    for key, model in _ITEM_MODELS.items():
+        items = data.get(key) or []
+        for item in items if isinstance(items, list) else []:
+            try:
+                getattr(actions, key).append(model.model_validate(item))
+            except ValidationError:
+                continue
+    return actions
+
+def merge_llm(result: POResult, raw: str) -> POResult:
+    try:
+        extra = validate_actions(repair_json(raw))
+    except ValueError as e:  # json.JSONDecodeError is a ValueError
+        return result.model_copy(update={"llm_error": f"unusable model output: {e}"})
+    asked = set(result.unparsed_lines)
+    for key in _ITEM_MODELS:
+        for item in getattr(extra, key):
+            if item.line not in asked:
+                item.line = None  # not one of the lines the model was given
+    merged = POActions(**{key: getattr(result, key) + getattr(extra, key) for key in _ITEM_MODELS})
+    return _result(merged, unparsed=result.unparsed, unparsed_lines=result.unparsed_lines, source="rules+llm")
@@ -0,0 +1,154 @@
+# backend/postprocess.py
+import re
+
+from prompts import BANLIST
+
+# Local review of generated text: banlist, Claim -> Mechanism -> Impact per contention, First/Second/Third
+# signposting, sentence length and speech length. Only sections that fail go back to the LLM for polish.
+
+SENTENCE_WORDS = (10, 22)  # target mean words per sentence (speeches)
+WPM = (120, 180)  # prompts ask for ~140-160 wpm; anything in this band is deliverable
+
+# ===== Banlist: one compiled alternation, longest phrase first =====
+def _phrase_pattern(phrase: str) -> str:
+    words = [re.escape(w.replace("’", "'")).replace("'", "['’]") for w in phrase.split()]
+    return r"\s+".join(words)
+
+BANLIST_RE = re.compile(
+    r"\b(?:" + "|".join(_phrase_pattern(p) for p in sorted(BANLIST, key=len, reverse=True)) + r")\b", re.I
+)
+
+def find_banned(text: str) -> list[str]:
+    return sorted({" ".join(m.group(0).lower().split()) for m in BANLIST_RE.finditer(text or "")})
+
+# ===== Sections =====
+_HEADING_RE = re.compile(
+    r"^[ \t#*•]*\[?[ \t]*(AFFIRMATION|AFFIRMATIVE|NEGATION|NEGATIVE|QUICK QX PACK|ANALOGY (?:BANK|VARIATIONS)"
+    r"|BILL SUMMARY)\b[^\n]{0,40}$", re.I | re.M,
+)
+_SIDES = ("AFF", "NEG")
+
+def split_sections(text: str) -> list[tuple[str, str]]:
+    # [(heading, section text including its heading line)]; text before the first heading has heading ""
+    starts = [(m.start(), m.group(1).upper()) for m in _HEADING_RE.finditer(text)]
+    if not starts or starts[0][0] > 0:
+        starts.insert(0, (0, ""))
+    bounds = starts + [(len(text), None)]
+    return [(title, text[start:bounds[i + 1][0]]) for i, (start, title) in enumerate(starts)]
+
+# ===== Checks =====
+_SIGNPOST_RE = re.compile(r"\b(First|Second|Third)(?:ly)?\b|^\s*(?:[-•*]\s*)?([123])[).]", re.M)
+_OPENER_RE = re.compile(r"^[ \t]*(?:[-•*][ \t]*)?(?:(First|Second|Third)(?:ly)?\b|([123])[).])", re.M)
+_CHAIN_RE = re.compile(r"→|->|—")
+_MECHANISM_RE = re.compile(
+    r"\bbecause\b|\bleads? to\b|\bcaus(?:e|es|ing)\b|\bresults? in\b|\btriggers?\b|\bforces?\b|\btherefore\b|\bmechanism\b",
+    re.I,
+)
+_IMPACT_RE = re.compile(r"\bwhat this means\b|\bimpacts?\b|\bso what\b|\bmatters because\b", re.I)
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+def _contentions(text: str) -> list[str]:
+    # Split at the last occurrence of each signpost (First/Second/Third or 1)/2)/3)): prompts ask for the
+    # words in the roadmap sentence too, so the first "First" is usually the roadmap, not contention 1.
+    # Signposts opening a line or paragraph win over ones mid-sentence.
+    marks, openers = {}, {}
+    for m in _SIGNPOST_RE.finditer(text):
+        marks[(m.group(1) or m.group(2)).lower()] = m.start()
+    for m in _OPENER_RE.finditer(text):
+        openers[(m.group(1) or m.group(2)).lower()] = m.start()
+    marks.update(openers)
+    starts = sorted(marks.values())[:3]
+    return [text[a:b] for a, b in zip(starts, starts[1:] + [len(text)])]
+
+def _has_chain(contention: str) -> bool:
+    # Package bullets chain with arrows/dashes; speech prose needs a causal link and an impact bridge
+    if len(_CHAIN_RE.findall(contention)) >= 2:
+        return True
+    return bool(_MECHANISM_RE.search(contention) and _IMPACT_RE.search(contention))
+
+def check_section(text: str, kind: str, side: bool = True, minutes: int | None = None) -> list[str]:
+    # side=False (QX pack, analogy bank, summary): banlist only; minutes: check one speech's length
+    issues = []
+    banned = find_banned(text)
+    if banned:
+        issues.append("replace banned phrases: " + ", ".join(banned))
+    if not side:
+        return issues
+
+    signposts = {(m.group(1) or m.group(2)).lower() for m in _SIGNPOST_RE.finditer(text)}
+    if not ({"first", "second", "third"} <= signposts or {"1", "2", "3"} <= signposts):
+        issues.append("signpost the three contentions with First / Second / Third")
+    weak = [i + 1 for i, c in enumerate(_contentions(text)) if not _has_chain(c)]
+    if weak:
+        issues.append("give contention(s) " + ", ".join(map(str, weak)) +
+                      " an explicit Claim → Mechanism → Impact → \"what this means\" chain")
+
+    if kind != "speeches":
+        return issues
+    words = len(text.split())
+    sentences = [s for s in _SENTENCE_RE.split(text.strip()) if s.strip()]
+    mean = words / len(sentences) if sentences else 0
+    if not SENTENCE_WORDS[0] <= mean <= SENTENCE_WORDS[1]:
+        issues.append(f"average {mean:.0f} words per sentence; aim for {SENTENCE_WORDS[0]}–{SENTENCE_WORDS[1]}")
+    if minutes:
+        low, high = WPM[0] * minutes, WPM[1] * minutes
+        if not low <= words <= high:
+            issues.append(f"{words} words for a {minutes}-minute speech; aim for {low}–{high}")
+    return issues
+
+class Review:
+    def __init__(self, text: str, kind: str, minutes: int | None = None):
+        self.sections = split_sections(text or "")
+        self.issues = {}
+        headed = len(self.sections) > 1
+        for i, (title, body) in enumerate(self.sections):
+            # Unheaded output is checked as a whole; otherwise only AFF/NEG sections carry structure
+            side = title.startswith(_SIDES) if headed else True
+            found = check_section(body, kind, side, minutes if side and title else None)
+            if found:
+                self.issues[i] = found
+
+    @property
+    def failing(self) -> list[int]:
+        return sorted(self.issues)
+
+    def splice(self, polished: dict[int, str]) -> str:
+        # Polished sections replace the originals in place; keep the heading if the model dropped it
+        out = []
+        for i, (title, body) in enumerate(self.sections):
+            if i not in polished:
+                out.append(body)
+                continue
+            text = polished[i].strip()
+            if title and not _HEADING_RE.match(text):
+                text = body.split("\n", 1)[0].rstrip() + "\n" + text
+            out.append(text + ("\n\n" if i < len(self.sections) - 1 else ""))
+        return "".join(out)
+
+    def to_dict(self) -> dict:
+        return {self.sections[i][0] or "text": issues for i, issues in self.issues.items()}
+
+# ===== Self-check: python postprocess.py =====
+# A well-structured speech with a capitalized roadmap must pass (no polish call)
+_ROADMAP_SPEECH = """\
+Rural hospitals are closing faster than at any point in the last forty years, and this bill finally answers that.
+My roadmap: First, funding. Second, rural patients. Third, long-term savings for every state budget.
+
+First, the bill fixes funding because it ties reimbursement to actual rural costs rather than urban averages.
+That leads to stable operating margins for small hospitals that today lose money on nearly every Medicare patient.
+What this means is that doors stay open and staff stay employed in towns that have nowhere else to turn.
+
+Second, rural patients gain access because stable hospitals keep their emergency rooms and maternity wards running.
+That results in shorter ambulance rides, earlier treatment for strokes, and fewer births on the side of a highway.
+The impact is simple and measurable: fewer preventable deaths in communities that policymakers too often overlook.
+
+Third, the bill produces savings because early local care is far cheaper than late care in distant trauma centers.
+Preventive visits cause fewer costly admissions, and states spend less on emergency transport every single year.
+So what? This reform pays for itself over time while making rural health care more reliable for every family.
+I proudly urge an affirmative vote today.
+"""
+
+if __name__ == "__main__":
+    issues = check_section(_ROADMAP_SPEECH, "speeches")
+    assert not issues, issues
+    print("ok")
@@ -1,4 +1,7 @@
 # backend/prompts.py
+from functools import lru_cache
+
+from tokens import estimate_tokens, estimate_message_tokens
 
 # ===== Shared banlist and style kernels =====
 BANLIST = [
@@ -6,6 +9,10 @@ BANLIST = [
     "snake oil", "technological overreach", "chasing unicorns", "balance in research",
     "science isn’t settled", "science is not settled", "frontier of hope", "seeds of hope"
 ]
+BANLIST_TEXT = ", ".join(BANLIST)
+
+# Static segments are compiled once at import and always lead the message list, so every request
+# shares a byte-identical prefix (provider prompt caching / Ollama KV reuse). Variable parts go last.
 
 SPEECH_SYSTEM = """
 You are a Congressional Debate finalist. Given a bill, write two complete, ready-to-deliver speeches:
@@ -15,7 +22,7 @@ Constraints:
 - Nationals-final tone: brisk signposting, vivid but tasteful imagery, clean transitions, tight warrants.
 - Include: Hook (1–2 sentences), Roadmap (1 sentence), 3 flowing contentions (Claim → Mechanism (2–3 steps) → Impact → "what this means"),
   weighing (probability • timeframe • irreversibility/distribution), crystallization, and a memorable closing line.
-- Natural paragraphs (no bullet points), ~140–160 wpm pacing. Aim for ~{minutes} minutes each.
+- Natural paragraphs (no bullet points), ~140–160 wpm pacing. Aim for the target length given with the bill.
 - Do NOT fabricate statistics; when suggesting evidence, phrase as "According to [credible source category] ...".
 - Vary rhetoric: one analogy or framing device; one "what this means" bridge per contention; one crystallization.
 - Before writing, brainstorm 5 analogy candidates per side; pick the best one to use in each speech.
@@ -51,6 +58,7 @@ For biomedical/regenerative topics also explore:
 - Dual-use & militarization (performance enhancement vs therapy optics)
 """
 
+@lru_cache(maxsize=64)
 def _style_extra(style_lc: str, novelty: str):
     extras = {
         "creative": " Lean into vivid, debate-appropriate imagery; keep one memorable image per speech.",
@@ -66,9 +74,10 @@ def _style_extra(style_lc: str, novelty: str):
     return extra
 
 # ===== Full speeches =====
+SPEECH_SYSTEM_MSG = {"role": "system", "content": SPEECH_SYSTEM.format(banlist=BANLIST_TEXT)}
+
 def build_speech_prompt(bill: str, minutes: int = 2, style: str = "nationals", novelty: str = "standard", custom_instructions: str | None = None):
     style_lc = (style or "nationals").lower().strip()
-    system_prompt = SPEECH_SYSTEM.format(minutes=minutes, banlist=", ".join(BANLIST)) + _style_extra(style_lc, novelty)
 
     user_prompt = f"""
 Bill:
@@ -101,7 +110,8 @@ Replace any banned phrases with fresher wording.
         user_prompt += f"\n\nADDITIONAL INSTRUCTIONS:\n{custom_instructions.strip()}"
 
     return [
-        {"role": "system", "content": system_prompt},
+        SPEECH_SYSTEM_MSG,
+        {"role": "system", "content": _style_extra(style_lc, novelty).strip()},
         {"role": "user", "content": user_prompt},
     ]
 
@@ -177,6 +187,31 @@ NEGATION
 • Rhetoric: Hook: "A cure you can’t manufacture is a promise you can’t keep." | Analogy: "Tracks with no steel." | Crystallization: "If access is zero, impact is zero."
 """
 
+CREATIVE_PIPELINE = f"""
+Follow this pipeline silently (do NOT print steps):
+1) List 8–12 expected/common arguments for both sides as one-liners. Do not use these in the final.
+2) Using the general taxonomy and the biomedical one below, brainstorm 12–18 unconventional candidates across distinct buckets. Avoid clichés.
+3) Score each: novelty (0–10) and plausibility (0–10). Keep only items with novelty ≥ 7 and plausibility ≥ 7. Sort by total.
+4) From the top 3 per side, write full contentions (Claim → Mechanism → Impact → "what this means"). Distinct mechanisms only.
+5) Rhetoric: Hook, sharp Analogy, Crystallization line per side matching the chosen angles.
+6) ANALOGY VARIATIONS: 5 extra one-liners for AFF and 5 for NEG tied to the chosen angles.
+7) Hide the brainstorming and scores. Return only the final package.
+
+General Taxonomy:
+{NOVELTY_TAXONOMY}
+
+Biomedical Taxonomy:
+{BIOMED_TAXONOMY}
+"""
+
+ARGUMENT_PREFIX = (
+    {"role": "system", "content": SYSTEM_COACH},
+    {"role": "user", "content": FEW_SHOT_EXAMPLE.strip()},
+    {"role": "user", "content": FEW_SHOT_BIOMED.strip()},
+)
+# Only used in high/wild novelty; still static, so it extends the shared prefix for those requests
+CREATIVE_MSG = {"role": "user", "content": ("CREATIVE MODE PIPELINE" + CREATIVE_PIPELINE).strip()}
+
 def build_argument_prompt(
     bill: str,
     minutes: int = 2,
@@ -185,40 +220,25 @@ def build_argument_prompt(
     novelty: str = "standard",
     custom_instructions: str | None = None,
 ):
+    creative = (novelty or "standard").lower() in {"high", "wild"}
     user = f"""Bill:
 {bill}
 
 Please produce BOTH sides in the schema, using {minutes}:00 speech density. Style preset: {style}. Return cross-ex questions: {return_qx}.
 Always include ANALOGY VARIATIONS (5 for AFF, 5 for NEG).
-Replace any banned phrases with fresher wording: {", ".join(BANLIST)}.
+Replace any banned phrases with fresher wording: {BANLIST_TEXT}.
 """
 
-    if (novelty or "standard").lower() in {"high", "wild"}:
+    if creative:
         user += f"""
-
-CREATIVE MODE: {novelty.upper()}
-Follow this pipeline silently (do NOT print steps):
-1) List 8–12 expected/common arguments for both sides as one-liners. Do not use these in the final.
-2) Using the general taxonomy and the biomedical one below, brainstorm 12–18 unconventional candidates across distinct buckets. Avoid clichés.
-3) Score each: novelty (0–10) and plausibility (0–10). Keep only items with novelty ≥ 7 and plausibility ≥ 7. Sort by total.
-4) From the top 3 per side, write full contentions (Claim → Mechanism → Impact → "what this means"). Distinct mechanisms only.
-5) Rhetoric: Hook, sharp Analogy, Crystallization line per side matching the chosen angles.
-6) ANALOGY VARIATIONS: 5 extra one-liners for AFF and 5 for NEG tied to the chosen angles.
-7) Hide the brainstorming and scores. Return only the final package.
-
-General Taxonomy:
-{NOVELTY_TAXONOMY}
-
-Biomedical Taxonomy:
-{BIOMED_TAXONOMY}
+CREATIVE MODE: {novelty.upper()} — apply the creative mode pipeline above.
 """
     if custom_instructions:
         user += f"\nADDITIONAL INSTRUCTIONS:\n{custom_instructions.strip()}"
 
     return [
-        {"role": "system", "content": SYSTEM_COACH},
-        {"role": "user", "content": FEW_SHOT_EXAMPLE.strip()},
-        {"role": "user", "content": FEW_SHOT_BIOMED.strip()},
+        *ARGUMENT_PREFIX,
+        *((CREATIVE_MSG,) if creative else ()),
         {"role": "user", "content": user.strip()},
     ]
 
@@ -235,6 +255,8 @@ Rules:
 - Ensure analogies map directly to the mechanism (no "hope" metaphors).
 """
 
+POLISH_SYSTEM_MSG = {"role": "system", "content": POLISH_SYSTEM.format(banlist=BANLIST_TEXT)}
+
 def build_polish_prompt(raw_text: str, style: str = "razor", custom_instructions: str | None = None):
     instr = ""
     if custom_instructions:
@@ -248,16 +270,28 @@ def build_polish_prompt(raw_text: str, style: str = "razor", custom_instructions
 Return the same sections in the same order. Do not add new sections. Style preset: {style}.
 """
     return [
-        {"role": "system", "content": POLISH_SYSTEM.format(banlist=", ".join(BANLIST))},
+        POLISH_SYSTEM_MSG,
         {"role": "user", "content": user},
     ]
 
 # ===== PO assistant (needed by your main.py import) =====
+PO_SYSTEM = """
+You are a Presiding Officer assistant. Each line of PO-style text starts with its number in brackets, e.g. [3].
+Output one JSON object with exactly these keys; "line" is the number of the line the item comes from:
+{"recognitions": [{"speaker": str, "kind": "speech"|"question", "side": "affirmative"|"negative"|"authorship"|"sponsorship"|null, "line": int}],
+ "question_blocks": [{"action": "open"|"close", "seconds": int|null, "line": int}],
+ "time_notices": [{"speaker": str|null, "seconds_remaining": int|null, "grace": bool, "line": int}],
+ "motions": [{"kind": "previous_question"|"table"|"adjourn"|"recess"|"extend_questioning"|"suspend_rules"|"amend"|"other",
+              "mover": str|null, "seconded": bool, "outcome": "passed"|"failed"|null, "line": int}]}
+Use [] for anything the text does not mention. No prose, no code fences.
+"""
+
+PO_SYSTEM_MSG = {"role": "system", "content": PO_SYSTEM.strip()}
+
 def build_po_prompt(text: str):
-    sys = "You are a Presiding Officer assistant. From PO-style text, output a JSON of actions: recognitions (who), open/close question blocks, time notices, motions, seating/order."
     user = f"PO Text:\n{text}\nReturn JSON only."
     return [
-        {"role": "system", "content": sys},
+        PO_SYSTEM_MSG,
         {"role": "user", "content": user},
     ]
 
@@ -269,12 +303,96 @@ Follow the user's instructions faithfully. If a bill is provided, stay on-topic.
 Avoid clichés: {banlist}.
 """
 
-def build_chat_prompt(message: str, bill: str | None, style: str = "razor", novelty: str = "standard"):
+CHAT_SYSTEM_MSG = {"role": "system", "content": CHAT_SYSTEM.format(banlist=BANLIST_TEXT)}
+
+def build_chat_prompt(message: str, bill: str | None, style: str = "razor", novelty: str = "standard",
+                      package: str | None = None, summary: str | None = None, history: list | None = None):
     style_note = _style_extra(style.lower().strip(), novelty)
-    sys = CHAT_SYSTEM.format(banlist=", ".join(BANLIST)) + f"\nStyle kernel: {style_note}\n"
-    context = f"Bill context:\n{bill}\n\n" if bill else ""
-    user = f"""{context}User request:\n{message}\n"""
+    messages = [
+        CHAT_SYSTEM_MSG,
+        {"role": "system", "content": f"Style kernel: {style_note}"},
+    ]
+    if history is None and summary is None and package is None:
+        # Stateless chat: bill rides along in the user turn
+        context = f"Bill context:\n{bill}\n\n" if bill else ""
+        messages.append({"role": "user", "content": f"""{context}User request:\n{message}\n"""})
+        return messages
+    # Session chat: per-session context first (stable across turns, so it stays in the provider's prefix
+    # cache), then the running summary, recent turns, and only the new message
+    context = []
+    if bill:
+        context.append(f"Bill context:\n{bill}")
+    if package:
+        context.append(f"Argument package generated earlier in this session:\n{package}")
+    if context:
+        messages.append({"role": "system", "content": "\n\n".join(context)})
+    if summary:
+        messages.append({"role": "system", "content": f"Summary of the conversation so far:\n{summary}"})
+    messages += history or []
+    messages.append({"role": "user", "content": message})
+    return messages
+
+CHAT_SUMMARY_SYSTEM_MSG = {
+    "role": "system",
+    "content": "You maintain the running summary of a debate coaching chat. Merge the previous summary with the "
+               "new turns into one summary under 200 words. Keep decisions, requested changes, constraints, "
+               "preferences and any text the user adopted; drop pleasantries. Plain text only.",
+}
+
+def build_chat_summary_prompt(summary: str | None, turns: list):
+    transcript = "\n\n".join(f"{t['role'].upper()}: {t['content']}" for t in turns)
+    user = f"Previous summary:\n{summary or '(none)'}\n\nNew turns:\n{transcript}"
     return [
-        {"role": "system", "content": sys},
-        {"role": "user", "content": user}
+        CHAT_SUMMARY_SYSTEM_MSG,
+        {"role": "user", "content": user},
+    ]
+
+# ===== Token report: boilerplate vs bill, per builder =====
+_SAMPLE_A, _SAMPLE_B = "Sample bill A.", "Sample bill B, different."
+
+def _shared_prefix_tokens(a, b) -> int:
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += estimate_message_tokens([x])
+    return n
+
+def prompt_token_report(bill: str = "") -> dict:
+    builders = {
+        "argument": lambda b: build_argument_prompt(b),
+        "argument_creative": lambda b: build_argument_prompt(b, novelty="wild"),
+        "speech": lambda b: build_speech_prompt(b),
+        "polish": lambda b: build_polish_prompt(b),
+        "chat": lambda b: build_chat_prompt("Give me three QX questions.", b),
+        "po": lambda b: build_po_prompt(b),
+    }
+    bill_tokens = estimate_tokens(bill)
+    report = {}
+    for name, build in builders.items():
+        total = estimate_message_tokens(build(bill))
+        report[name] = {
+            "total_tokens": total,
+            "bill_tokens": bill_tokens,
+            "boilerplate_tokens": total - bill_tokens,
+            "static_prefix_tokens": _shared_prefix_tokens(build(_SAMPLE_A), build(_SAMPLE_B)),
+        }
+    return report
+
+# ===== Long-bill digest (map step) =====
+DIGEST_SYSTEM_MSG = {
+    "role": "system",
+    "content": """
+You condense one section of a long legislative bill for debate prep.
+Keep: what the section does, who it binds or funds, dollar amounts, dates/deadlines, enforcement, and definitions other sections rely on.
+Drop: boilerplate, cross-reference chains, formatting. Do not editorialize or add facts.
+Return 3–8 terse lines, no preamble.
+""".strip(),
+}
+
+def build_section_summary_prompt(section: str, index: int, total: int):
+    user = f"Section {index} of {total}:\n{section.strip()}"
+    return [
+        DIGEST_SYSTEM_MSG,
+        {"role": "user", "content": user},
     ]
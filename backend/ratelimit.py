@@ -0,0 +1,87 @@
+# backend/ratelimit.py
+import os
+import time
+import asyncio
+
+from llm import LLMClient, WrappedLLMClient
+from metrics import observe_queue_wait
+from tokens import estimate_message_tokens
+
+# ===== Token bucket (per-minute budget, refilled continuously) =====
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.waited = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0):
+        # Requests larger than the whole bucket would never fit; let them drain it instead
+        amount = min(amount, self.capacity)
+        async with self._lock:  # FIFO: earlier callers are served first
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                delay = (amount - self.tokens) / self.rate
+                self.waited += delay
+                await asyncio.sleep(delay)
+
+# Wraps a provider client; every upstream call spends 1 request + its estimated tokens
+class RateLimitedLLMClient(WrappedLLMClient):
+    def __init__(self, inner: LLMClient, rpm: float | None = None, tpm: float | None = None, completion_tokens: int = 1200):
+        super().__init__(inner)
+        self.rpm = TokenBucket(rpm) if rpm else None
+        self.tpm = TokenBucket(tpm) if tpm else None
+        self.completion_tokens = completion_tokens
+
+    async def _admit(self, messages, n: int = 1):
+        # n completions: one request sharing the prompt with a native `n`, otherwise n separate requests
+        requests = 1 if self.inner.native_n else n
+        start = time.monotonic()
+        if self.rpm:
+            await self.rpm.acquire(requests)
+        if self.tpm:
+            await self.tpm.acquire(requests * estimate_message_tokens(messages) + n * self.completion_tokens)
+        observe_queue_wait("ratelimit", time.monotonic() - start)
+
+    async def agenerate(self, messages):
+        await self._admit(messages)
+        return await self.inner.agenerate(messages)
+
+    async def agenerate_n(self, messages, n: int) -> list[str]:
+        await self._admit(messages, n)
+        return await self.inner.agenerate_n(messages, n)
+
+    async def astream(self, messages):
+        await self._admit(messages)
+        async for piece in self.inner.astream(messages):
+            yield piece
+
+    def stats(self) -> dict:
+        return {
+            **self.inner.stats(),
+            "ratelimit": {
+                "rpm": self.rpm.capacity if self.rpm else None,
+                "tpm": self.tpm.capacity if self.tpm else None,
+                "wait_seconds": round((self.rpm.waited if self.rpm else 0) + (self.tpm.waited if self.tpm else 0), 3),
+            },
+        }
+
+def build_rate_limit(inner: LLMClient, provider: str) -> LLMClient:
+    # <PROVIDER>_RPM / <PROVIDER>_TPM, e.g. OPENAI_RPM=500 OPENAI_TPM=30000; unset = unlimited
+    prefix = provider.upper()
+    rpm = float(os.getenv(f"{prefix}_RPM", "0") or 0)
+    tpm = float(os.getenv(f"{prefix}_TPM", "0") or 0)
+    if not rpm and not tpm:
+        return inner
+    completion = int(os.getenv("LLM_EXPECTED_COMPLETION_TOKENS", "1200"))
+    return RateLimitedLLMClient(inner, rpm or None, tpm or None, completion)
@@ -0,0 +1,279 @@
+# backend/router.py
+import os
+import time
+import asyncio
+from collections import deque
+
+from llm import LLMClient, build_provider
+
+# ===== Per-backend health: rolling latency/error window + circuit breaker =====
+class Backend:
+    def __init__(self, name: str, client: LLMClient, window: int = 100,
+                 failure_threshold: int = 5, cooldown: float = 30.0, cold_latency: float = 10.0):
+        self.name = name
+        self.client = client
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.outcomes: deque[bool] = deque(maxlen=window)
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.consecutive_failures = 0
+        self.opened_at: float | None = None  # breaker open since (None = closed)
+        self.probing = False
+        self.calls = 0
+        self.cold_latency = cold_latency  # assumed latency until a call has succeeded
+        self.last_call = 0.0
+
+    def percentile(self, p: float) -> float | None:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+    @property
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.cooldown else "open"
+
+    def available(self) -> bool:
+        # Half-open lets exactly one probe through; its outcome closes or re-opens the breaker
+        state = self.state
+        return state == "closed" or (state == "half_open" and not self.probing)
+
+    def claim(self):
+        # Taken before the probe is scheduled, so concurrent callers cannot both probe
+        if self.state == "half_open":
+            self.probing = True
+
+    def release(self):
+        # Call ended without a verdict (cancelled, stream closed early): free the probe slot
+        self.probing = False
+
+    def record(self, latency: float, ok: bool):
+        self.calls += 1
+        self.last_call = time.monotonic()
+        self.outcomes.append(ok)
+        self.probing = False
+        if ok:
+            self.latencies.append(latency)
+            self.consecutive_failures = 0
+            self.opened_at = None
+            return
+        self.consecutive_failures += 1
+        tripped = self.consecutive_failures >= self.failure_threshold
+        if len(self.outcomes) >= 10 and self.error_rate > 0.5:
+            tripped = True
+        if tripped or self.opened_at is not None:
+            self.opened_at = time.monotonic()
+
+    def score(self) -> float:
+        # Lower is better: median latency inflated by recent errors. A backend not called for a cooldown
+        # (or never) is tried early, so a cold-start failure cannot sideline it for good; one with only
+        # failures so far ranks on an assumed latency rather than dropping out of the order
+        if self.state == "closed" and time.monotonic() - self.last_call >= self.cooldown:
+            return 0.0
+        p50 = self.percentile(50)
+        return (self.cold_latency if p50 is None else p50) * (1 + 4 * self.error_rate)
+
+    def stats(self) -> dict:
+        p50, p95 = self.percentile(50), self.percentile(95)
+        return {
+            "state": self.state,
+            "calls": self.calls,
+            "p50_s": round(p50, 3) if p50 is not None else None,
+            "p95_s": round(p95, 3) if p95 is not None else None,
+            "error_rate": round(self.error_rate, 3),
+        }
+
+# ===== Router client =====
+# Sends each call to the fastest healthy backend; optionally hedges a second backend after a
+# percentile-based delay, and fails over to the next backend when a call errors.
+class RouterLLMClient(LLMClient):
+    def __init__(self, backends: list[Backend], hedge: bool = False, hedge_percentile: float = 95,
+                 hedge_min_delay: float = 0.5, hedge_default_delay: float = 10.0, max_attempts: int = 2):
+        if not backends:
+            raise RuntimeError("Router needs at least one backend (LLM_BACKENDS)")
+        self.backends = backends
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_default_delay = hedge_default_delay
+        self.max_attempts = max(1, min(max_attempts, len(backends)))
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def fingerprint(self) -> dict:
+        return {"client": type(self).__name__, "backends": [b.client.fingerprint() for b in self.backends]}
+
+    def _ranked(self) -> list[Backend]:
+        healthy = [b for b in self.backends if b.available()]
+        # Every breaker open: degrade to best effort rather than failing outright
+        return sorted(healthy or self.backends, key=Backend.score)
+
+    def _hedge_delay(self, backend: Backend) -> float:
+        p = backend.percentile(self.hedge_percentile)
+        return max(self.hedge_min_delay, p if p is not None else self.hedge_default_delay)
+
+    async def _call(self, backend: Backend, messages):
+        start = time.monotonic()
+        try:
+            result = await backend.client.agenerate(messages)
+        except Exception:
+            backend.record(time.monotonic() - start, ok=False)
+            raise
+        backend.record(time.monotonic() - start, ok=True)
+        return result
+
+    def generate(self, messages):
+        last_error = None
+        for backend in self._ranked()[: self.max_attempts]:
+            start = time.monotonic()
+            try:
+                result = backend.client.generate(messages)
+            except Exception as e:
+                backend.record(time.monotonic() - start, ok=False)
+                last_error = e
+                continue
+            backend.record(time.monotonic() - start, ok=True)
+            return result
+        raise last_error
+
+    async def agenerate(self, messages):
+        ranked = self._ranked()
+        candidates = iter(ranked[: self.max_attempts])
+        tasks: dict[asyncio.Task, Backend] = {}
+        pending: set[asyncio.Task] = set()
+        hedged = False
+        last_error = None
+
+        def launch() -> bool:
+            backend = next(candidates, None)
+            if backend is None:
+                return False
+            backend.claim()
+            task = asyncio.create_task(self._call(backend, messages))
+            # Also covers a hedge cancelled before it started running
+            task.add_done_callback(lambda t, b=backend: b.release() if t.cancelled() else None)
+            tasks[task] = backend
+            pending.add(task)
+            return True
+
+        launch()
+        try:
+            while pending:
+                timeout = None
+                if self.hedge and not hedged and len(tasks) == 1:
+                    timeout = self._hedge_delay(ranked[0])
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Primary is slower than its usual tail: race a second backend
+                    hedged = True
+                    if launch():
+                        self.hedges += 1
+                    continue
+                for task in done:
+                    if task.exception() is None:
+                        if hedged and tasks[task] is not ranked[0]:
+                            self.hedge_wins += 1
+                        return task.result()
+                    last_error = task.exception()
+                if not pending:
+                    launch()  # failover
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def agenerate_n(self, messages, n: int) -> list[str]:
+        # Fan-out calls are already the expensive kind; fail over, but do not hedge
+        last_error = None
+        for backend in self._ranked()[: self.max_attempts]:
+            backend.claim()
+            start = time.monotonic()
+            ok = None
+            try:
+                result = await backend.client.agenerate_n(messages, n)
+                ok = True
+                return result
+            except Exception as e:
+                ok = False
+                last_error = e
+            finally:
+                if ok is None:
+                    backend.release()
+                else:
+                    backend.record(time.monotonic() - start, ok)
+        raise last_error
+
+    async def astream(self, messages):
+        # Streams are not hedged; fail over only if a backend errors before its first token
+        last_error = None
+        for backend in self._ranked()[: self.max_attempts]:
+            backend.claim()
+            start = time.monotonic()
+            started = False
+            ok = None
+            try:
+                async for piece in backend.client.astream(messages):
+                    started = True
+                    yield piece
+                ok = True
+            except Exception as e:
+                ok = False
+                if started:
+                    raise
+                last_error = e
+                continue
+            finally:
+                # Cancellation or the consumer closing the stream (GeneratorExit) leaves ok unset
+                if ok is None:
+                    backend.release()
+                else:
+                    backend.record(time.monotonic() - start, ok)
+            return
+        raise last_error
+
+    async def aclose(self):
+        for b in self.backends:
+            await b.client.aclose()
+
+    def stats(self) -> dict:
+        stats = {}
+        for b in self.backends:
+            for key, value in b.client.stats().items():
+                stats.setdefault(key, {})[b.name] = value
+        stats["router"] = {
+            "hedge": self.hedge,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "backends": {b.name: b.stats() for b in self.backends},
+        }
+        return stats
+
+def build_backend(spec: str) -> Backend:
+    # "openai:gpt-4o" | "ollama:llama3" | "ollama:llama3@http://10.0.0.5:11434" | "mock:a"
+    provider, _, rest = spec.strip().partition(":")
+    provider = provider.lower()
+    model, _, base = rest.partition("@")
+    if provider not in ("openai", "ollama", "mock"):
+        raise RuntimeError(f"Unknown provider in LLM_BACKENDS: {spec!r}")
+    client = build_provider(provider, model or None, base or None)
+    return Backend(spec.strip(), client,
+                   failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+                   cooldown=float(os.getenv("LLM_BREAKER_COOLDOWN", "30")),
+                   cold_latency=float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "10")))
+
+def build_router() -> RouterLLMClient:
+    specs = [s for s in os.getenv("LLM_BACKENDS", "").split(",") if s.strip()]
+    return RouterLLMClient(
+        [build_backend(s) for s in specs],
+        hedge=os.getenv("LLM_HEDGE", "0") == "1",
+        hedge_percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", "95")),
+        hedge_min_delay=float(os.getenv("LLM_HEDGE_MIN_DELAY", "0.5")),
+        hedge_default_delay=float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "10")),
+        max_attempts=int(os.getenv("LLM_ROUTER_ATTEMPTS", "2")),
+    )
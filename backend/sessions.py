@@ -0,0 +1,135 @@
+# backend/sessions.py
+import os
+import time
+import uuid
+import asyncio
+import hashlib
+from collections import OrderedDict
+
+from metrics import log_event, span
+from prompts import build_chat_summary_prompt
+from tokens import estimate_message_tokens
+
+# Server-side chat sessions: the bill (digested once), the last generated package, recent turns and a
+# running summary of older turns. Each chat turn then sends only the new message.
+
+class Session:
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.bill: str | None = None  # prepared (digested if long) bill text
+        self.bill_hash: str | None = None
+        self.package: str | None = None
+        self.summary: str | None = None
+        self.turns: list[dict] = []  # chat messages, oldest first
+        self.summarized_turns = 0
+        self.lock = asyncio.Lock()  # one turn (or compaction) at a time
+        self.updated_at = time.time()
+
+    def touch(self):
+        self.updated_at = time.time()
+
+    def same_bill(self, bill: str) -> bool:
+        return self.bill_hash == _bill_hash(bill)
+
+    def set_bill(self, raw: str, prepared: str):
+        if not self.same_bill(raw):
+            self.package = None  # a package for another bill is no longer context
+        self.bill_hash = _bill_hash(raw)
+        self.bill = prepared
+
+    def add_turn(self, message: str, reply: str):
+        self.turns += [{"role": "user", "content": message}, {"role": "assistant", "content": reply}]
+        self.touch()
+
+    def recent(self, budget: int) -> list[dict]:
+        # Newest turns that fit the budget; bounds the prompt even while a compaction is pending or failing
+        kept, used = [], 0
+        for i in range(len(self.turns) - 2, -1, -2):
+            pair = self.turns[i:i + 2]
+            used += estimate_message_tokens(pair)
+            if used > budget:
+                break
+            kept[:0] = pair
+        return kept
+
+    def to_dict(self) -> dict:
+        return {
+            "session_id": self.id,
+            "has_bill": self.bill is not None,
+            "has_package": self.package is not None,
+            "turns": len(self.turns) // 2,
+            "summarized_turns": self.summarized_turns,
+            "history_tokens": estimate_message_tokens(self.turns),
+            "updated_at": self.updated_at,
+        }
+
+def _bill_hash(bill: str) -> str:
+    return hashlib.sha256((bill or "").encode("utf-8")).hexdigest()
+
+class SessionStore:
+    def __init__(self, ttl: float, max_sessions: int, history_tokens: int, keep_turns: int):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.history_tokens = history_tokens  # budget for verbatim turns in each prompt
+        self.keep_turns = keep_turns  # turns left verbatim after a compaction
+        self._sessions: OrderedDict[str, Session] = OrderedDict()
+        self._tasks: set[asyncio.Task] = set()
+        self.compactions = 0
+
+    def _evict(self):
+        cutoff = time.time() - self.ttl
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if oldest.updated_at >= cutoff and len(self._sessions) <= self.max_sessions:
+                break
+            self._sessions.popitem(last=False)
+
+    def create(self) -> Session:
+        session = Session()
+        self._sessions[session.id] = session
+        self._evict()
+        return session
+
+    def get(self, session_id: str) -> Session | None:
+        self._evict()
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.touch()
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def schedule_compaction(self, client, session: Session):
+        # Off the response path: the turn that crosses the budget does not pay for the summary call
+        if estimate_message_tokens(session.turns) <= self.history_tokens:
+            return
+        task = asyncio.create_task(self.compact(client, session))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def compact(self, client, session: Session):
+        async with session.lock:
+            keep = 2 * self.keep_turns
+            if estimate_message_tokens(session.turns) <= self.history_tokens or len(session.turns) <= keep:
+                return
+            split = len(session.turns) - keep
+            old, recent = session.turns[:split], session.turns[split:]
+            try:
+                with span("chat_summary"):
+                    session.summary = await client.agenerate(build_chat_summary_prompt(session.summary, old))
+            except Exception as e:
+                log_event("chat_summary_failed", session_id=session.id, error=str(e))
+                return
+            session.turns = recent
+            session.summarized_turns += len(old) // 2
+            self.compactions += 1
+
+    def stats(self) -> dict:
+        return {"sessions": len(self._sessions), "compactions": self.compactions}
+
+def build_session_store() -> SessionStore:
+    return SessionStore(
+        ttl=float(os.getenv("CHAT_SESSION_TTL", "7200")),
+        max_sessions=int(os.getenv("CHAT_SESSION_MAX", "1000")),
+        history_tokens=int(os.getenv("CHAT_HISTORY_TOKENS", "1500")),
+        keep_turns=int(os.getenv("CHAT_KEEP_TURNS", "2")),
+    )
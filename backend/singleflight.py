@@ -0,0 +1,144 @@
+# backend/singleflight.py
+import asyncio
+
+from llm import LLMClient, WrappedLLMClient
+
+# ===== Single-flight: identical in-flight calls share one upstream call =====
+class _Call:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: dict[str, _Call] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def __len__(self):
+        return len(self._calls)
+
+    def _forget(self, key: str, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    async def do(self, key: str, fn):
+        # fn is a zero-arg coroutine factory; only the first caller for a key runs it
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _t: self._forget(key, call))
+            self.leaders += 1
+        else:
+            self.followers += 1
+        call.waiters += 1
+        try:
+            # Shield so one waiter giving up does not cancel the call for everyone else
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Nobody is left to read the result
+                self._forget(key, call)
+                call.task.cancel()
+
+class _StreamCall:
+    def __init__(self):
+        self.chunks: list[str] = []
+        self.done = False
+        self.error: BaseException | None = None
+        self.cond = asyncio.Condition()
+        self.waiters = 0
+        self.task: asyncio.Task | None = None
+
+class StreamSingleFlight:
+    # Same idea for token streams: late joiners replay what was buffered, then follow live
+    def __init__(self):
+        self._calls: dict[str, _StreamCall] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def __len__(self):
+        return len(self._calls)
+
+    def _forget(self, key: str, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    async def _pump(self, key: str, call: _StreamCall, stream):
+        try:
+            async for piece in stream:
+                async with call.cond:
+                    call.chunks.append(piece)
+                    call.cond.notify_all()
+        except BaseException as e:
+            call.error = e
+            if isinstance(e, asyncio.CancelledError):
+                raise
+        finally:
+            await stream.aclose()
+            self._forget(key, call)
+            async with call.cond:
+                call.done = True
+                call.cond.notify_all()
+
+    async def do(self, key: str, stream_fn):
+        call = self._calls.get(key)
+        if call is None:
+            call = _StreamCall()
+            self._calls[key] = call
+            call.task = asyncio.ensure_future(self._pump(key, call, stream_fn()))
+            self.leaders += 1
+        else:
+            self.followers += 1
+        call.waiters += 1
+        i = 0
+        try:
+            while True:
+                async with call.cond:
+                    await call.cond.wait_for(lambda: call.done or len(call.chunks) > i)
+                    pending = call.chunks[i:]
+                    finished = call.done
+                for piece in pending:
+                    yield piece
+                i += len(pending)
+                if finished and i >= len(call.chunks):
+                    break
+            if call.error is not None:
+                if isinstance(call.error, asyncio.CancelledError):
+                    raise RuntimeError("upstream stream was cancelled")
+                raise call.error
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                self._forget(key, call)
+                call.task.cancel()
+
+# Wraps another client; identical prompts in flight at the same time make one upstream call
+class CoalescingLLMClient(WrappedLLMClient):
+    # The sync generate path is not shared (inherited passthrough); every route goes through agenerate/astream
+    def __init__(self, inner: LLMClient):
+        super().__init__(inner)
+        self.calls = SingleFlight()
+        self.streams = StreamSingleFlight()
+
+    async def agenerate(self, messages):
+        return await self.calls.do(self.cache_key(messages), lambda: self.inner.agenerate(messages))
+
+    async def agenerate_n(self, messages, n: int) -> list[str]:
+        return await self.calls.do(f"{self.cache_key(messages)}:n{n}", lambda: self.inner.agenerate_n(messages, n))
+
+    async def astream(self, messages):
+        async for piece in self.streams.do(self.cache_key(messages), lambda: self.inner.astream(messages)):
+            yield piece
+
+    def stats(self) -> dict:
+        return {
+            **self.inner.stats(),
+            "singleflight": {
+                "inflight": len(self.calls) + len(self.streams),
+                "upstream_calls": self.calls.leaders + self.streams.leaders,
+                "coalesced": self.calls.followers + self.streams.followers,
+            },
+        }
@@ -0,0 +1,49 @@
+# backend/textsim.py
+import re
+import heapq
+import hashlib
+import unicodedata
+
+# Cheap near-duplicate detection: normalized word shingles, hashed; Jaccard on the sets for short
+# texts, bottom-k sketches when the sets are large or need storing.
+
+_TRANSLATE = str.maketrans({
+    "’": "'", "‘": "'", "“": '"', "”": '"', "–": "-", "—": "-", " ": " ", "•": " ",
+})
+_MARKUP_RE = re.compile(r"[*_#>`|]+")
+_SPACE_RE = re.compile(r"\s+")
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+def normalize(text: str) -> str:
+    # Pasted bills differ in quotes, dashes, bullets, markdown and line wrapping; none of that is content
+    text = unicodedata.normalize("NFKC", text or "").translate(_TRANSLATE)
+    return _SPACE_RE.sub(" ", _MARKUP_RE.sub(" ", text)).strip().lower()
+
+def fingerprint(text: str) -> str:
+    return hashlib.sha256(normalize(text).encode("utf-8")).hexdigest()
+
+def shingles(text: str, k: int = 5) -> set[int]:
+    words = _WORD_RE.findall(normalize(text))
+    grams = [words[i:i + k] for i in range(max(1, len(words) - k + 1))]
+    return {int.from_bytes(hashlib.blake2b(" ".join(g).encode(), digest_size=8).digest(), "big") for g in grams if g}
+
+def jaccard(a: set, b: set) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+# ===== Bottom-k sketch =====
+# The k smallest shingle hashes: one hash per shingle (unlike k-permutation MinHash), so building a
+# sketch costs about as much as hashing the text, and it is small enough to store per bill.
+SKETCH_SIZE = 64
+
+def sketch(items: set[int], k: int = SKETCH_SIZE) -> list[int]:
+    return heapq.nsmallest(k, items)
+
+def sketch_similarity(a: list[int], b: list[int], k: int = SKETCH_SIZE) -> float:
+    # Estimates Jaccard: of the k smallest hashes in the union, the share present in both sketches
+    union = heapq.nsmallest(k, set(a) | set(b))
+    if not union:
+        return 1.0
+    sa, sb = set(a), set(b)
+    return sum(1 for x in union if x in sa and x in sb) / len(union)
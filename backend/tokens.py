@@ -0,0 +1,13 @@
+# backend/tokens.py
+# Rough token estimates for budgeting (rate limits, chunking, prompt reports).
+# ~4 characters per token is close enough for English prose on GPT/Llama tokenizers.
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str | None) -> int:
+    if not text:
+        return 0
+    return max(1, (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN)
+
+def estimate_message_tokens(messages) -> int:
+    # ~4 tokens of chat framing per message on top of the content
+    return sum(estimate_tokens(m.get("content", "")) + 4 for m in messages)
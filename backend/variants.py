@@ -0,0 +1,52 @@
+# backend/variants.py
+import re
+
+from postprocess import find_banned
+from textsim import jaccard, shingles
+
+# Ranks N candidate packages locally: near-duplicates (by contention shingles) are dropped, the rest
+# are ordered by how different their contentions are from the other survivors', minus banlist hits.
+
+DUPLICATE_TEXT = 0.8  # whole-package shingle Jaccard at which two candidates are the same
+DUPLICATE_CONTENTION = 0.6  # contention-level Jaccard at which two contentions make the same point
+BANNED_PENALTY = 0.25
+
+_CONTENTION_RE = re.compile(r"^\s*(?:[-•*]\s*)?(?:[1-9][).]|First\b|Second\b|Third\b).*$", re.M)
+
+def _contentions(text: str) -> list[set[int]]:
+    found = [shingles(m.group(0), k=3) for m in _CONTENTION_RE.finditer(text)]
+    return found or [shingles(text, k=3)]
+
+def _overlap(mine: list[set[int]], theirs: list[set[int]]) -> list[float]:
+    # For each of my contentions: similarity to the closest contention in `theirs`
+    return [max((jaccard(c, o) for o in theirs), default=0.0) for c in mine]
+
+def _is_duplicate(c: dict, kept: dict) -> bool:
+    if jaccard(c["shingles"], kept["shingles"]) >= DUPLICATE_TEXT:
+        return True
+    repeated = sum(s >= DUPLICATE_CONTENTION for s in _overlap(c["contentions"], kept["contentions"]))
+    return repeated * 3 >= len(c["contentions"]) * 2  # two of three contentions already made
+
+def rank_variants(texts: list[str]) -> tuple[list[dict], int]:
+    # -> (ranked variants, best first; number of near-duplicates dropped)
+    candidates = [
+        {"text": t, "contentions": _contentions(t), "shingles": shingles(t), "banned": find_banned(t)}
+        for t in texts if t and t.strip()
+    ]
+    # Dedupe first (cleaner copy of a near-duplicate pair wins), so twins do not sink each other's novelty
+    kept = []
+    for c in sorted(candidates, key=lambda c: len(c["banned"])):
+        if not any(_is_duplicate(c, k) for k in kept):
+            kept.append(c)
+    for i, c in enumerate(kept):
+        others = [o for j, other in enumerate(kept) if j != i for o in other["contentions"]]
+        overlap = _overlap(c["contentions"], others)
+        c["novelty"] = 1 - sum(overlap) / len(overlap)
+        c["score"] = c["novelty"] - BANNED_PENALTY * len(c["banned"])
+    ranked = sorted(kept, key=lambda c: c["score"], reverse=True)
+    variants = [
+        {"rank": i + 1, "text": c["text"], "score": round(c["score"], 3), "novelty": round(c["novelty"], 3),
+         "banned": c["banned"]}
+        for i, c in enumerate(ranked)
+    ]
+    return variants, len(candidates) - len(ranked)